@@ -0,0 +1,129 @@
+# actors.py - 每場遊戲一個單一寫入者（actor）：指令投遞到信箱，由共用的工作執行緒池依序執行
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger('game.actors')
+
+ACTOR_BATCH_SIZE = 32  # 每次最多連續處理的指令數，之後讓出工作執行緒給其他遊戲
+
+
+class ActorClosed(RuntimeError):
+    """遊戲的 actor 已移除（遊戲已回收），不再接受指令"""
+
+
+class GameActor:
+    """一場遊戲的信箱：同一時間最多一個工作執行緒處理，指令依投遞順序執行"""
+
+    def __init__(self, game_id, executor):
+        self.game_id = game_id
+        self.executor = executor
+        self.inbox = deque()  # (函數, 參數, Future)
+        self.lock = threading.Lock()
+        self.scheduled = False  # 是否已有處理工作排入執行緒池
+        self.owner = None  # 正在執行指令的執行緒 ident
+        self.closed = False
+
+    def post(self, func, *args):
+        """投遞指令，回傳可等待結果的 Future（actor 已關閉時拋出 ActorClosed）"""
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise ActorClosed(self.game_id)
+            self.inbox.append((func, args, future))
+            if self.scheduled:
+                return future
+            self.scheduled = True
+        self.executor.submit(self._drain)
+        return future
+
+    def close(self):
+        """拒絕之後的指令，尚未執行的指令以 ActorClosed 結束"""
+        with self.lock:
+            self.closed = True
+            pending = list(self.inbox)
+            self.inbox.clear()
+        for _, _, future in pending:
+            future.set_exception(ActorClosed(self.game_id))
+
+    def _drain(self):
+        self.owner = threading.get_ident()
+        try:
+            for _ in range(ACTOR_BATCH_SIZE):
+                with self.lock:
+                    if not self.inbox:
+                        self.scheduled = False
+                        return
+                    func, args, future = self.inbox.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(func(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            self.owner = None
+
+        # 信箱還有指令：重新排隊，避免單一忙碌的遊戲佔住工作執行緒
+        self.executor.submit(self._drain)
+
+
+class ActorSystem:
+    """管理所有遊戲的 actor 與共用的工作執行緒池
+
+    遊戲狀態只在自己的 actor 上修改，不同遊戲可在不同工作執行緒上同時執行，
+    不需要全域鎖。actor 只在建立或還原遊戲時以 spawn 建立；移除後對該代碼的
+    投遞一律拋出 ActorClosed，不會另外建立一個同時修改同一場遊戲的 actor。
+    """
+
+    def __init__(self, workers=8):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='game-actor')
+        self.actors = {}  # game_id: GameActor
+        self.lock = threading.Lock()
+
+    def spawn(self, game_id):
+        """為新建立或還原的遊戲建立 actor"""
+        with self.lock:
+            actor = self.actors[game_id] = GameActor(game_id, self.executor)
+            return actor
+
+    def actor(self, game_id):
+        with self.lock:
+            actor = self.actors.get(game_id)
+        if actor is None:
+            raise ActorClosed(game_id)
+        return actor
+
+    def post(self, game_id, func, *args):
+        """投遞指令但不等待結果（失敗時記錄日誌）"""
+        future = self.actor(game_id).post(func, *args)
+        future.add_done_callback(lambda done: self._log_failure(game_id, done))
+        return future
+
+    def call(self, game_id, func, *args, timeout=None):
+        """投遞指令並等待結果（例外會在呼叫端重新拋出）"""
+        actor = self.actor(game_id)
+        if actor.owner == threading.get_ident():
+            return func(*args)  # 已在此遊戲的 actor 上，直接執行以免等待自己
+        return actor.post(func, *args).result(timeout)
+
+    def remove(self, game_id):
+        """遊戲回收時移除並關閉 actor（可在該 actor 的指令中呼叫，之後的指令不再執行）"""
+        with self.lock:
+            actor = self.actors.pop(game_id, None)
+        if actor is not None:
+            actor.close()
+
+    def count(self):
+        with self.lock:
+            return len(self.actors)
+
+    @staticmethod
+    def _log_failure(game_id, future):
+        if not future.cancelled() and future.exception() is not None:
+            error = future.exception()
+            if isinstance(error, ActorClosed):
+                return  # 遊戲已回收，略過的指令不需記錄
+            logger.error("遊戲指令執行錯誤", exc_info=(type(error), error, error.__traceback__),
+                         extra={'game_id': game_id})
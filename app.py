@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify, Response
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import json
 import threading
@@ -6,55 +6,411 @@ import time
 from datetime import datetime
 import uuid
 import random
+import secrets
 import json
 import os
-from scoring import scoring_system
+from collections import deque
+from itertools import islice
+from contextlib import nullcontext
+from scoring import scoring_system, HISTORY_SERIES
+from country_state import CountryState
+from economy_engine import economy_engine
+from scheduler import DeadlineScheduler
+from sharding import shard_config
+from persistence import game_persistence, LogArchive
+from events_catalog import event_catalog_source
+import metrics
+from logging_setup import configure_logging, get_logger
+from lifecycle import RoomIdAllocator, GameLifecycleManager
+from projections import project_player, project_players, VIEW_SCHEMAS, INDICATOR_FIELDS
+from actors import ActorSystem, ActorClosed
+from outbound import OutboundDispatcher
+from wire import Fragment, BINARY_WIRE, BINARY_EVENTS, binary_available, pack_binary
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True)
+SOCKETIO_LOGGING = os.environ.get('SOCKETIO_LOGGING', '').lower() in ('1', 'true', 'yes')  # 逐封包日誌（除錯用）
+socketio = SocketIO(app, cors_allowed_origins="*", logger=SOCKETIO_LOGGING, engineio_logger=SOCKETIO_LOGGING,
+                    message_queue=shard_config.message_queue,  # 多行程分片時透過訊息佇列跨行程廣播
+                    json=metrics.CountingJSON)  # 編碼時累計各事件送出的訊息數與位元組數
+
+# 各子系統 logger（限流設定見 SAMPLED_LOGGERS）
+game_logger = get_logger('state')
+events_logger = get_logger('events')
+bubble_logger = get_logger('bubble')
+timer_logger = get_logger('timer')
+policy_logger = get_logger('policy')
+socket_logger = get_logger('socket')
+SAMPLED_LOGGERS = ('events', 'bubble', 'timer', 'policy', 'socket')  # 可能大量重複的訊息
 
 # 全局遊戲狀態存儲
 games = {}  # game_id: GameState
 players = {}  # session_id: player_info
 timer_thread = None  # 計時器執行緒
+REALTIME_FRAME_INTERVAL = 0.5  # 實時更新間隔（秒）
+game_scheduler = DeadlineScheduler(REALTIME_FRAME_INTERVAL)  # 各遊戲的幀與季度截止時間
+game_actors = ActorSystem(int(os.environ.get('GAME_WORKERS', 8)))  # 每場遊戲的狀態只由自己的 actor 修改
+def binary_room(game_id):
+    """使用二進位格式的客戶端所在的房間（JSON 客戶端在 game_id 房間）"""
+    return f'{game_id}/{BINARY_WIRE}'
+
+def room_size(room):
+    return sum(1 for _ in socketio.server.manager.get_participants('/', room))
+
+def player_slot_lookup(game_id):
+    """回傳 player_id -> slot 的查詢函數（slot 在加入時決定，之後不變）"""
+    game = games.get(game_id)
+    def slot_of(player_id):
+        player = game.players.get(player_id) if game is not None else None
+        return player.get('slot') if player is not None else None
+    return slot_of
+
+def emit_binary(event, payload, game_id, recipients, **kwargs):
+    """以 MessagePack 送出（附件不經 JSON 編碼，另外累計送出量）"""
+    data = pack_binary(payload, player_slot_lookup(game_id))
+    socketio.emit(event, data, **kwargs)
+    metrics.emitted_messages.inc(recipients, event)
+    metrics.emitted_bytes.inc(recipients * len(data), event)
+
+def send_room_message(event, payload, room=None, to=None):
+    """送出排隊的訊息
+
+    JSON 資料包成 Fragment，房間內所有接收者共用同一次編碼；高頻事件另以
+    MessagePack 送給連線時選用二進位格式的客戶端。
+    """
+    if to is not None:
+        if event in BINARY_EVENTS and players.get(to, {}).get('wire') == BINARY_WIRE:
+            emit_binary(event, payload, room, 1, to=to)
+        else:
+            socketio.emit(event, Fragment(payload), to=to)
+        return
+    
+    if event not in BINARY_EVENTS:
+        socketio.emit(event, Fragment(payload), to=[room, binary_room(room)])
+        return
+    socketio.emit(event, Fragment(payload), to=room)
+    recipients = room_size(binary_room(room))
+    if recipients:
+        emit_binary(event, payload, room, recipients, to=binary_room(room))
+
+def close_game_rooms(game_id):
+    socketio.close_room(game_id)
+    socketio.close_room(binary_room(game_id))
+
+outbound = OutboundDispatcher(  # 每個房間的送出佇列，慢速房間不會拖慢其他遊戲
+    send_room_message, close=close_game_rooms,
+    workers=int(os.environ.get('OUTBOUND_WORKERS', 4)),
+    capacity=int(os.environ.get('OUTBOUND_QUEUE_SIZE', 16)),
+    on_drop=lambda event, reason: metrics.outbound_dropped.inc(1, event, reason)
+)
+
+# 遊戲日誌設定
+GAME_LOG_CAPACITY = int(os.environ.get('GAME_LOG_CAPACITY', 200))  # 每場遊戲保留的日誌筆數
+GAME_LOG_ARCHIVE_DIR = os.environ.get('GAME_LOG_ARCHIVE_DIR')  # 選用：超出容量的日誌寫入磁碟
+game_log_archive = LogArchive(GAME_LOG_ARCHIVE_DIR) if GAME_LOG_ARCHIVE_DIR else None
+LOG_PAGE_LIMIT = 100  # fetch_log 每次最多回傳筆數
+
+# 每場遊戲獨立的亂數子系統
+RNG_STREAMS = ('events', 'economics', 'bubble', 'oil', 'passive', 'policy')
+
+class GameRandom:
+    """每場遊戲獨立、可重現的亂數來源（依子系統分流）
+
+    各子系統使用由 seed 衍生的獨立 random.Random，
+    同一個 seed 搭配相同的行動紀錄可以完整重播一場遊戲。
+    """
+    def __init__(self, seed):
+        self.seed = seed
+        for name in RNG_STREAMS:
+            setattr(self, name, random.Random(f'{seed}:{name}'))
+    
+    def getstate(self):
+        """取得所有子系統的亂數狀態"""
+        return {name: getattr(self, name).getstate() for name in RNG_STREAMS}
+    
+    def setstate(self, state):
+        """還原所有子系統的亂數狀態（接受 JSON 還原後的 list）"""
+        for name in RNG_STREAMS:
+            version, internal_state, gauss_next = state[name]
+            getattr(self, name).setstate((version, tuple(internal_state), gauss_next))
 
 class GameState:
-    def __init__(self, game_id, host_player_id):
+    def __init__(self, game_id, host_player_id, headless=False, seed=None):
         self.game_id = game_id
         self.host_player_id = host_player_id
+        self.created_at = time.time()
+        self.last_activity = self.created_at  # 最近一次玩家操作（閒置回收用）
+        self.ended_at = None
+        # 亂數種子記錄在遊戲資訊中，可用於重播
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 63)
+        self.rng = GameRandom(self.seed)
+        self.tick_count = 0  # 已執行的實時更新次數
+        # 重播用紀錄：政策行動與季度推進（依發生順序）；伺服器模式下只寫入持久化日誌，不保留在記憶體
+        self.action_log = [] if headless else None
+        self.journal_seq = 0  # 最新一筆持久化日誌的序號
+        # 無伺服器模式（批次模擬）：不使用計時排程、向量引擎與 Socket.IO
+        self.headless = headless
+        self.scheduler = None if headless else game_scheduler
+        self.engine = None if headless else economy_engine
+        self.persistence = None if headless else game_persistence
+        self.final_scores = None
         self.players = {}  # player_id: player_data
         self.current_quarter = 1
         self.quarter_start_time = None
         self.quarter_duration = 30.0  # 30秒一季
         self.is_paused = False
+        self.paused_at = None  # 暫停開始時間
         self.game_started = False
-        self.game_log = []
+        self.game_log = deque(maxlen=GAME_LOG_CAPACITY)  # 固定容量的環狀緩衝區
+        self.log_seq = 0  # 最新一筆日誌的序號
+        self.broadcast_log_seq = 0  # 上一次季度推播時的日誌序號
         self.global_oil_price = 80.0  # 全球石油價格基準
         self.events_triggered = []  # 新增：記錄已觸發的事件
-        self.event_config = self.load_events_config()  # 新增：載入事件配置
+        self.event_catalog = event_catalog_source.current()  # 共用的唯讀事件目錄
         self.event_probabilities = {
             'global': 0.5,  # 全球事件機率（每季40%）
             'country': 0.6  # 國家事件機率（每季30%）
         }
         self.scoring_enabled = False  # 是否啟用評分
         self.game_duration_quarters = 17  # 預設17季
-        self.quarter_scores = {}  # 儲存每季度分數
+        self.quarter_scores = {}  # 儲存每季度分數（季度: 當時的排名與分數明細）
+        self.history_stats = {}  # player_id: 評分用的歷史滑動統計
+        self.standings_version = 0  # 評分輸入變動（季度結束、政策行動）時遞增
+        self.standings_cache = None  # (standings_version, 排名)
+        self.standings_lock = threading.Lock()  # 同時到達的排名查詢共用同一次計算
+        self.realtime_seq = 0  # 實時更新序號
+        self.realtime_baseline = {}  # player_id: 上一幀送出的玩家投影副本
+        self.pending_actions = deque()  # (sid, player_id, 行動資料, 收到時間)，於下一幀依到達順序套用
+        self.fragment_cache = {}  # 欄位定義: (狀態版本, 玩家投影的預先編碼片段)
         
     def add_player(self, player_id, player_name, country_code):
         """添加玩家到遊戲"""
-        print(f"添加玩家: {player_name} ({country_code})")
+        game_logger.info("添加玩家: %s (%s)", player_name, country_code, extra={'game_id': self.game_id})
         self.players[player_id] = {
             'id': player_id,
             'name': player_name,
             'country_code': country_code,
             'country_name': COUNTRY_CONFIGS[country_code]['name'],
             'country_flag': COUNTRY_CONFIGS[country_code]['flag'],
+            'slot': len(self.players),  # 加入順序（二進位格式以此代表玩家）
+            'rejoin_token': secrets.token_urlsafe(16),  # 重新連線用的座位密鑰（只送給該玩家）
             'country_data': self._initialize_country_data(country_code),
             'connected': True,
             'last_action_time': time.time()
         }
         
+        self.history_stats[player_id] = scoring_system.create_history_stats(self.players[player_id]['country_data'])
+        self.invalidate_standings()
+        if self.engine is not None:
+            self.engine.register(self.game_id, player_id, self.players[player_id]['country_data'],
+                                 running=self.is_ticking())
+        self.touch()
+        self.save_snapshot()
+    
+    def get_metadata(self):
+        """遊戲基本資訊（含亂數種子，搭配 action_log 或持久化日誌可重播）"""
+        return {
+            'game_id': self.game_id,
+            'seed': self.seed,
+            'created_at': self.created_at,
+            'host_player_id': self.host_player_id,
+            'quarter_duration': self.quarter_duration,
+            'game_duration_quarters': self.game_duration_quarters,
+            'players': [
+                {'id': player['id'], 'name': player['name'], 'country_code': player['country_code']}
+                for player in self.players.values()
+            ]
+        }
+    
+    def touch(self):
+        """記錄玩家操作時間（所有玩家離線後由此開始計算閒置）"""
+        self.last_activity = time.time()
+    
+    def release(self):
+        """遊戲被回收時釋放排程、引擎槽位、持久化檔案與日誌封存檔（房間代碼之後會重複使用）"""
+        if self.scheduler is not None:
+            self.scheduler.remove_game(self.game_id)
+        if self.engine is not None:
+            self.engine.release_game(self.game_id)
+        if self.persistence is not None:
+            self.persistence.delete(self.game_id)
+        if game_log_archive is not None:
+            game_log_archive.delete(self.game_id)
+    
+    def queue_action(self, sid, player_id, data):
+        """排入政策行動，由計時器在下一幀套用（在遊戲的 actor 上呼叫）"""
+        self.pending_actions.append((sid, player_id, data, time.time()))
+    
+    def reject_pending_actions(self, message):
+        """捨棄尚未套用的政策行動，並回覆錯誤給各發送者"""
+        while self.pending_actions:
+            sid = self.pending_actions.popleft()[0]
+            if not self.headless:
+                outbound.emit(self.game_id, 'error', {'message': message}, to=sid)
+    
+    def is_ticking(self):
+        """計時器是否會處理這場遊戲的實時幀"""
+        return self.game_started and not self.is_paused
+    
+    def record_action(self, player_id, data, current_time):
+        """記錄成功的政策行動（重播用）"""
+        self.touch()
+        entry = {
+            'type': 'policy_action',
+            'tick': self.tick_count,
+            'time': current_time,
+            'player_id': player_id,
+            'data': data
+        }
+        self.log_action(entry)
+    
+    def log_action(self, entry):
+        """記錄重播用的行動或季度推進"""
+        if self.action_log is not None:
+            self.action_log.append(entry)
+        self.journal(entry)
+    
+    def journal(self, record):
+        """附加一筆持久化日誌（依序編號，快照記錄寫入時的序號）"""
+        if self.persistence is not None:
+            self.journal_seq += 1
+            self.persistence.append(self.game_id, dict(record, seq=self.journal_seq))
+    
+    def save_snapshot(self):
+        """寫入持久化快照"""
+        if self.persistence is not None:
+            self.persistence.save_snapshot(self.game_id, self.to_snapshot())
+    
+    def to_snapshot(self):
+        """序列化目前的遊戲狀態（行動歷史保留在持久化日誌，不寫入快照）"""
+        quarter_elapsed = None
+        if self.quarter_start_time:
+            quarter_elapsed = (self.paused_at or time.time()) - self.quarter_start_time
+        return {
+            'metadata': self.get_metadata(),
+            'players': [copy_state(player) for player in self.players.values()],
+            'current_quarter': self.current_quarter,
+            'quarter_elapsed': quarter_elapsed,
+            'is_paused': self.is_paused,
+            'game_started': self.game_started,
+            'game_log': list(self.game_log),
+            'log_seq': self.log_seq,
+            'broadcast_log_seq': self.broadcast_log_seq,
+            'global_oil_price': self.global_oil_price,
+            'events_triggered': self.events_triggered,
+            'scoring_enabled': self.scoring_enabled,
+            'quarter_scores': self.quarter_scores,
+            'tick_count': self.tick_count,
+            'realtime_seq': self.realtime_seq,
+            'rng_state': self.rng.getstate(),
+            'journal_seq': self.journal_seq,
+            'final_scores': self.final_scores,
+            'ended_at': self.ended_at
+        }
+    
+    @classmethod
+    def from_snapshot(cls, snapshot, records=()):
+        """由快照與其後的日誌還原遊戲（還原期間不發送事件、不寫入日誌）"""
+        metadata = snapshot['metadata']
+        game = cls(metadata['game_id'], metadata['host_player_id'], headless=True, seed=metadata['seed'])
+        game.created_at = metadata['created_at']
+        game.quarter_duration = metadata['quarter_duration']
+        game.game_duration_quarters = metadata['game_duration_quarters']
+        
+        for slot, player in enumerate(snapshot['players']):
+            player['connected'] = False  # 等待玩家重新連線
+            player.setdefault('slot', slot)
+            player.setdefault('rejoin_token', secrets.token_urlsafe(16))
+            player['country_data'] = CountryState.from_dict(player['country_data'])
+            game.players[player['id']] = player
+            game.history_stats[player['id']] = scoring_system.create_history_stats(player['country_data'])
+        
+        game.current_quarter = snapshot['current_quarter']
+        game.is_paused = snapshot['is_paused']
+        game.game_started = snapshot['game_started']
+        game.game_log.extend(snapshot['game_log'])
+        game.log_seq = snapshot['log_seq']
+        game.broadcast_log_seq = snapshot['broadcast_log_seq']
+        game.global_oil_price = snapshot['global_oil_price']
+        game.events_triggered = snapshot['events_triggered']
+        game.scoring_enabled = snapshot['scoring_enabled']
+        game.quarter_scores = {int(quarter): scores for quarter, scores in snapshot['quarter_scores'].items()}
+        game.tick_count = snapshot['tick_count']
+        game.realtime_seq = snapshot['realtime_seq']
+        game.rng.setstate(snapshot['rng_state'])
+        game.journal_seq = snapshot.get('journal_seq', 0)
+        game.final_scores = snapshot['final_scores']
+        game.ended_at = snapshot.get('ended_at')
+        
+        # 重播快照之後的日誌（與 simulation.replay_game 相同的順序）
+        snapshot_ticks = game.tick_count
+        for record in records:
+            seq = record.get('seq')
+            if seq is not None:
+                if seq <= game.journal_seq:
+                    continue  # 快照之前的紀錄
+                game.journal_seq = seq
+            if record['type'] not in ('policy_action', 'quarter'):
+                continue  # 事件由季度推進重新產生
+            while game.tick_count < record['tick']:
+                game.tick_realtime()
+            if record['type'] == 'quarter':
+                game.advance_quarter()
+            else:
+                apply_policy_action(game, game.players[record['player_id']], record['data'],
+                                    current_time=record['time'])
+        
+        # 季度進度：快照時的經過時間加上重播的實時更新時間
+        elapsed = snapshot['quarter_elapsed'] or 0
+        elapsed += (game.tick_count - snapshot_ticks) * REALTIME_FRAME_INTERVAL
+        elapsed = min(elapsed, game.quarter_duration)
+        game.quarter_start_time = time.time() - elapsed
+        if game.is_paused and game.game_started:
+            game.paused_at = time.time()
+        
+        return game
+    
+    def attach_runtime(self):
+        """還原後接回伺服器元件（向量引擎、計時排程、持久化）"""
+        self.headless = False
+        self.action_log = None  # 之後的行動只寫入持久化日誌
+        self.last_activity = time.time()  # 給玩家重新連線的時間
+        self.scheduler = game_scheduler
+        self.engine = economy_engine
+        self.persistence = game_persistence
+        
+        if self.engine is not None:
+            for player_id, player in self.players.items():
+                self.engine.register(self.game_id, player_id, player['country_data'])
+        
+        if self.game_started and not self.is_paused:
+            if self.engine is not None:
+                self.engine.set_running(self.game_id, True)
+            self.scheduler.add_game(self.game_id, self.get_quarter_deadline())
+        
+        # 以還原後的狀態作為新的基準
+        self.save_snapshot()
+    
+    def tick_realtime(self):
+        """實時更新一次（向量引擎啟用時由引擎以陣列更新這場遊戲的數值）"""
+        self.tick_count += 1
+        if self.engine is None:
+            for player in self.players.values():
+                update_realtime_economics(player['country_data'])
+        else:
+            self.engine.tick_game(self.game_id)
+    
+    def emit_to_room(self, event, payload):
+        """向遊戲房間廣播（無伺服器模式下略過）"""
+        if not self.headless:
+            outbound.emit(self.game_id, event, payload)
+    
+    def state_lock(self):
+        """修改玩家狀態時使用（向量引擎啟用時先將陣列寫回字典）"""
+        if self.engine is None:
+            return nullcontext()
+        return self.engine.editing(self.game_id)
+        
     def _initialize_country_data(self, country_code):
         """初始化國家數據"""
         config = COUNTRY_CONFIGS[country_code]
@@ -121,17 +477,125 @@ class GameState:
             }
 
         })
-        return data
+        return CountryState.from_dict(data)
+    
+    def build_realtime_delta(self):
+        """產生實時更新的差異幀（只包含上一幀之後變動的欄位）"""
+        patches = []
+        
+        for player_id, player in self.players.items():
+            view = project_player(player, 'realtime_update')
+            baseline = self.realtime_baseline.get(player_id)
+            
+            # 新加入的玩家：送出完整投影
+            if baseline is None:
+                self.realtime_baseline[player_id] = view
+                patches.append(copy_state(view))
+                continue
+            
+            patch = {}
+            for key, value in view.items():
+                if key == 'country_data':
+                    changed = diff_state(baseline['country_data'], value)
+                    if changed:
+                        baseline['country_data'].update(copy_state(changed))
+                        patch['country_data'] = changed
+                elif baseline.get(key) != value:
+                    baseline[key] = copy_state(value)
+                    patch[key] = value
+            
+            if patch:
+                patch['id'] = player_id
+                patches.append(patch)
+        
+        base_seq = self.realtime_seq
+        self.realtime_seq += 1
+        return {
+            'seq': self.realtime_seq,
+            'base_seq': base_seq,
+            'player_patches': patches
+        }
+    
+    def players_fragment(self, event):
+        """事件的玩家投影（預先編碼）
+
+        狀態版本（實時 tick、評分輸入版本、玩家數）不變時，使用相同欄位定義的
+        事件（quarter_advanced、game_update、實時快照）共用同一份編碼。
+        """
+        schema = VIEW_SCHEMAS[event]
+        version = (self.tick_count, self.standings_version, len(self.players))
+        cached = self.fragment_cache.get(schema)
+        if cached is None or cached[0] != version:
+            cached = self.fragment_cache[schema] = (version, Fragment(project_players(self.players.values(), event)))
+        return cached[1]
+    
+    def build_realtime_snapshot(self):
+        """產生完整快照（加入遊戲或重新同步時使用）"""
+        return {
+            'full': True,
+            'seq': self.realtime_seq,
+            'players': self.players_fragment('realtime_update')
+        }
     
     def start_game(self):
         """開始遊戲"""
         self.game_started = True
         self.quarter_start_time = time.time()
+        if self.engine is not None:
+            self.engine.set_running(self.game_id, True)
+        if self.scheduler is not None:
+            self.scheduler.add_game(self.game_id, self.get_quarter_deadline())
         self.add_log("🎮 遊戲開始！所有央行行長就位")
-        print(f"遊戲 {self.game_id} 開始，計時器啟動")
+        self.touch()
+        self.save_snapshot()
+        game_logger.info("遊戲開始，計時器啟動", extra={'game_id': self.game_id})
+    
+    def set_duration(self, quarters):
+        """設定遊戲季數（進行中的遊戲重新排入季度截止時間）"""
+        self.game_duration_quarters = quarters
+        if self.scheduler is not None and self.is_ticking():
+            self.scheduler.schedule_quarter(self.game_id, self.get_quarter_deadline())
+    
+    def pause_game(self):
+        """暫停遊戲（停止計時與實時更新）"""
+        if not self.game_started or self.is_paused:
+            return False
+        self.is_paused = True
+        self.paused_at = time.time()
+        if self.engine is not None:
+            self.engine.set_running(self.game_id, False)
+        if self.scheduler is not None:
+            self.scheduler.remove_game(self.game_id)
+        self.add_log("⏸️ 遊戲暫停")
+        self.touch()
+        self.save_snapshot()
+        return True
+    
+    def resume_game(self):
+        """恢復遊戲（季度剩餘時間不受暫停影響）"""
+        if not self.game_started or not self.is_paused:
+            return False
+        self.quarter_start_time += time.time() - self.paused_at
+        self.is_paused = False
+        self.paused_at = None
+        if self.engine is not None:
+            self.engine.set_running(self.game_id, True)
+        if self.scheduler is not None:
+            self.scheduler.add_game(self.game_id, self.get_quarter_deadline())
+        self.add_log("▶️ 遊戲繼續")
+        self.touch()
+        self.save_snapshot()
+        return True
+    
+    def get_quarter_deadline(self):
+        """本季結束的時間點"""
+        return self.quarter_start_time + self.quarter_duration
         
     def get_quarter_progress(self):
         """獲取當前季度進度"""
+        if self.paused_at is not None:
+            elapsed = self.paused_at - self.quarter_start_time
+            return min(elapsed / self.quarter_duration, 1.0)
         if not self.quarter_start_time or self.is_paused:
             return 0.0
         
@@ -141,6 +605,8 @@ class GameState:
         
     def get_remaining_time(self):
         """獲取剩餘時間"""
+        if self.paused_at is not None:
+            return max(0, self.quarter_duration - (self.paused_at - self.quarter_start_time))
         if not self.quarter_start_time or self.is_paused:
             return self.quarter_duration
         
@@ -148,82 +614,51 @@ class GameState:
         remaining = max(0, self.quarter_duration - elapsed)
         return remaining
         
-    def load_events_config(self):
-        """從 JSON 檔案載入事件配置"""
-        try:
-            config_path = os.path.join(os.path.dirname(__file__), 'events_config.json')
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                print(f"✅ 事件配置載入成功，包含 {len(config.get('globalEvents', {}).get('good', []))} 個全球好事件")
-                return config
-        except FileNotFoundError:
-            print("⚠️ events_config.json 檔案未找到，使用預設事件")
-            return self.get_default_events()
-        except json.JSONDecodeError as e:
-            print(f"⚠️ events_config.json 格式錯誤: {e}，使用預設事件")
-            return self.get_default_events()
-    
-    def get_default_events(self):
-        """預設事件配置（當 JSON 檔案載入失敗時使用）"""
-        return {
-            "globalEvents": {
-                "good": [
-                    {
-                        "name": "全球經濟復甦",
-                        "description": "國際經濟展現強勁復甦動能",
-                        "effects": {"gdp": 1.0, "confidence": 10}
-                    }
-                ],
-                "bad": [
-                    {
-                        "name": "國際貿易衝突",
-                        "description": "主要經濟體貿易摩擦加劇",
-                        "effects": {"gdp": -1.0, "confidence": -10}
-                    }
-                ]
-            },
-            "countryEvents": {}
-        }
-    
     def trigger_random_events(self):
         """使用配置檔案觸發隨機事件"""
         events = []
         
         # 全球事件檢查
-        if random.random() < self.event_probabilities['global']:
+        if self.rng.events.random() < self.event_probabilities['global']:
             event = self.generate_global_event_from_config()
             if event:
                 events.append(event)
                 self.apply_global_event(event)
-                print(f"🌍 觸發全球事件: {event['name']}")
+                events_logger.info("🌍 觸發全球事件: %s", event['name'], extra={'game_id': self.game_id})
+                if not self.headless:
+                    metrics.events_triggered.inc(1, 'global')
         
         # 國家事件檢查
         for player_id, player in self.players.items():
-            if random.random() < self.event_probabilities['country']:
+            if self.rng.events.random() < self.event_probabilities['country']:
                 event = self.generate_country_event_from_config(player)
                 if event:
                     events.append(event)
                     self.apply_country_event(event, player)
-                    print(f"🏳️ 觸發國家事件: {event['country']} - {event['name']}")
+                    events_logger.info("🏳️ 觸發國家事件: %s - %s", event['country'], event['name'],
+                                       extra={'game_id': self.game_id})
+                    if not self.headless:
+                        metrics.events_triggered.inc(1, 'country')
         
         # 🔥 重要：必須回傳列表，即使是空列表
-        print(f"📊 總共生成 {len(events)} 個事件")
+        events_logger.debug("📊 總共生成 %d 個事件", len(events), extra={'game_id': self.game_id})
         return events  # 絕對不能回傳 True 或其他布林值
     
     def generate_global_event_from_config(self):
         """從配置檔案生成全球事件"""
         try:
-            is_good_news = random.random() < 0.5
+            is_good_news = self.rng.events.random() < 0.5
             event_type = "good" if is_good_news else "bad"
-            events_pool = self.event_config["globalEvents"][event_type]
+            events_pool = self.event_catalog.global_events[event_type]
             
             if not events_pool:
                 return None
                 
-            selected_event = random.choice(events_pool)
+            selected_event = self.rng.events.choice(events_pool)
             
             return {
                 'type': 'global',
+                'event_id': selected_event['event_id'],
                 'category': event_type,
                 'name': selected_event['name'],
                 'description': selected_event['description'],
@@ -231,31 +666,31 @@ class GameState:
                 'season': self.current_quarter
             }
         except (KeyError, IndexError) as e:
-            print(f"❌ 生成全球事件時發生錯誤: {e}")
+            events_logger.error("❌ 生成全球事件時發生錯誤: %s", e, extra={'game_id': self.game_id})
             return None
     
     def generate_country_event_from_config(self, player):
         """從配置檔案生成國家事件"""
         try:
-            country_name = self.get_country_name_chinese(player['country_code'])
-            country_config = self.event_config["countryEvents"].get(country_name)
+            country_config = self.event_catalog.country_events.get(player['country_code'])
             
             if not country_config:
-                print(f"⚠️ 國家 {country_name} 沒有事件配置")
+                events_logger.warning("⚠️ 國家 %s 沒有事件配置", player['country_code'])
                 return None
             
-            good_news_ratio = country_config.get("goodNewsRatio", 0.5)
-            is_good_news = random.random() < good_news_ratio
+            country_name = country_config['name']
+            is_good_news = self.rng.events.random() < country_config['good_news_ratio']
             event_type = "good" if is_good_news else "bad"
             
-            events_pool = country_config["events"][event_type]
+            events_pool = country_config[event_type]
             if not events_pool:
                 return None
                 
-            selected_event = random.choice(events_pool)
+            selected_event = self.rng.events.choice(events_pool)
             
             return {
                 'type': 'country',
+                'event_id': selected_event['event_id'],
                 'country': country_name,
                 'category': event_type,
                 'name': selected_event['name'],
@@ -265,81 +700,80 @@ class GameState:
                 'season': self.current_quarter
             }
         except (KeyError, IndexError) as e:
-            print(f"❌ 生成國家事件時發生錯誤: {e}")
+            events_logger.error("❌ 生成國家事件時發生錯誤: %s", e, extra={'game_id': self.game_id})
             return None
     
-    def get_country_name_chinese(self, country_code):
-        """將國家代碼轉換為中文名稱"""
-        mapping = {
-            'USA': '美國',
-            'CHN': '中國', 
-            'JPN': '日本',
-            'TWN': '台灣',
-            'SAU': '沙烏地阿拉伯',
-            'BRA': '巴西'
-        }
-        return mapping.get(country_code, country_code)
-    
     def apply_global_event(self, event):
         """應用全球事件效果"""
-        for player_id, player in self.players.items():
-            self.apply_event_effects(player['country_data'], event['effects'])
+        self.apply_event_effects(self.players.values(), event)
         
         self.add_log(f"🌍 {event['name']}: {event['description']}")
         self.events_triggered.append(event)
     
     def apply_country_event(self, event, target_player):
         """應用國家事件效果"""
-        self.apply_event_effects(target_player['country_data'], event['effects'])
+        self.apply_event_effects([target_player], event)
         
         # 處理全球影響
         if event.get('globalEffects'):
-            for player_id, player in self.players.items():
-                if player['id'] != target_player['id']:
-                    self.apply_event_effects(player['country_data'], event['globalEffects'])
+            others = [player for player in self.players.values() if player['id'] != target_player['id']]
+            self.apply_event_effects(others, event, 'globalEffects')
         
         self.add_log(f"🏳️ {event['country']} - {event['name']}: {event['description']}")
         self.events_triggered.append(event)
     
-    def apply_event_effects(self, country_data, effects):
-        """應用事件效果到國家數據"""
-        for effect_type, value in effects.items():
-            if effect_type == 'gdp':
-                country_data['gdp_trend'] += value
-            elif effect_type == 'confidence':
-                country_data['confidence'] = max(0, min(100, country_data['confidence'] + value))
-            elif effect_type == 'inflation':
-                country_data['inflation_trend'] += value
-            elif effect_type == 'unemployment':
-                country_data['unemployment_trend'] += value
-            elif effect_type == 'deficit':
-                country_data['fiscal_deficit'] += value
-            elif effect_type == 'stock_index':
-                country_data['stock_index_trend'] += value
-            elif effect_type == 'global_oil_price':  # 新增這個處理
-                old_price = self.global_oil_price
-                self.global_oil_price += value
-                self.global_oil_price = max(30, min(150, self.global_oil_price))
-                direction = "上漲" if value > 0 else "下跌"
-                self.add_log(f"🛢️ 國際油價{direction}${abs(value):.1f} (${old_price:.1f}→${self.global_oil_price:.1f})")
+    def apply_event_effects(self, players, event, key='effects'):
+        """將事件預先編譯的效果向量加到所有受影響玩家的國家數據（固定欄位排列，一次向量加法）"""
+        compiled = self.event_catalog.event_effects(event, key)
+        if compiled is None:
+            return
+        
+        vector, oil_change = compiled
+        if vector is not None:
+            for player in players:
+                player['country_data'].add_effects(vector)
+        
+        # 後處理：信心指數範圍限制
+        if 'confidence' in event[key]:
+            for player in players:
+                country_data = player['country_data']
+                country_data['confidence'] = max(0, min(100, country_data['confidence']))
+        
+        # 後處理：國際油價（每位受影響玩家各套用一次，與逐一套用時相同）
+        if oil_change:
+            for _ in players:
+                self.shift_global_oil_price(oil_change)
+    
+    def shift_global_oil_price(self, value):
+        """事件造成的國際油價變動"""
+        old_price = self.global_oil_price
+        self.global_oil_price += value
+        self.global_oil_price = max(30, min(150, self.global_oil_price))
+        direction = "上漲" if value > 0 else "下跌"
+        self.add_log(f"🛢️ 國際油價{direction}${abs(value):.1f} (${old_price:.1f}→${self.global_oil_price:.1f})")
 
     def advance_quarter(self):
         """推進到下一季度"""
+        self.log_action({'type': 'quarter', 'tick': self.tick_count})
         self.current_quarter += 1
-        self.quarter_start_time = time.time()
+        
+        # 下一季從本季截止時間起算，避免累積延遲（落後超過一季時才重新對時）
+        now = time.time()
+        deadline = self.get_quarter_deadline()
+        self.quarter_start_time = deadline if now - deadline < self.quarter_duration else now
         
         # 更新全球石油價格（隨機波動）
         self.update_global_oil_price()
         
         # 🔥 關鍵修正：確保正確呼叫和回傳事件
         triggered_events = self.trigger_random_events()  # 這必須回傳列表
-        print(f"🎯 觸發事件數量: {len(triggered_events) if triggered_events else 0}")
-        print(f"🎯 事件內容: {triggered_events}")
+        events_logger.debug("🎯 觸發事件數量: %d", len(triggered_events) if triggered_events else 0,
+                            extra={'game_id': self.game_id})
 
         # 🆕 檢查股市泡沫風險
         bubble_events = self.check_global_bubble_risk()
         if bubble_events:
-            print(f"💥 股市泡沫破裂事件: {len(bubble_events)} 個")
+            bubble_logger.info("💥 股市泡沫破裂事件: %d 個", len(bubble_events), extra={'game_id': self.game_id})
             # 將泡沫事件加入觸發事件列表
             if triggered_events is None:
                 triggered_events = []
@@ -350,8 +784,14 @@ class GameState:
             triggered_events = []
         
         # 更新所有玩家的經濟指標
-        for player_id, player in self.players.items():
-            self._update_player_economics(player)
+        if self.engine is not None:
+            noise = [self._draw_quarter_noise() for _ in self.players]
+            self.engine.step_quarter(self.game_id, noise)
+            for player in self.players.values():
+                self._record_quarter_history(player)
+        else:
+            for player_id, player in self.players.items():
+                self._update_player_economics(player)
             
         # 執行被動技能
         self.update_passive_skills()
@@ -369,17 +809,26 @@ class GameState:
             data['stock_history'].append(data.get('stock_index_change', 0))
             data['fiscal_deficit_history'].append(data['fiscal_deficit'])
             
-            # 保持歷史記錄在合理長度
-            max_history = 17  # 保留17季歷史
-            for key in ['gdp_growth_history', 'inflation_history', 
-                    'unemployment_history', 'confidence_history',
-                    'stock_history', 'fiscal_deficit_history']:
-                if len(data[key]) > max_history:
-                    data[key] = data[key][-max_history:]
+            # 歷史為固定長度的環形緩衝（自動捨棄最舊數值），並增量更新評分用的滑動統計
+            stats = self.history_stats.get(player['id'])
+            if stats is not None:
+                for key in HISTORY_SERIES:
+                    stats[key].push(data[key][-1])
+        
+        # 記錄本季分數（同時作為新的排名快取）
+        self.quarter_scores[self.current_quarter] = self.calculate_final_scores()
+        self.invalidate_standings()
+        self.standings_cache = (self.standings_version, self.quarter_scores[self.current_quarter])
+        
+        # 事件寫入日誌（僅供稽核，還原時由季度推進重新產生）
+        for event in triggered_events:
+            self.journal({'type': 'event', 'quarter': self.current_quarter, 'event': event})
         
         # 檢查是否遊戲結束
         if self.current_quarter >= self.game_duration_quarters:
             self.end_game()
+        else:
+            self.save_snapshot()
 
         # 🔥 重要：確保回傳事件列表而不是布林值
         return triggered_events  # 這裡不能回傳 True
@@ -388,26 +837,35 @@ class GameState:
         """遊戲結束處理"""
         self.game_started = False
         self.is_paused = True
+        self.ended_at = time.time()
+        if self.engine is not None:
+            self.engine.set_running(self.game_id, False)
+        if self.scheduler is not None:
+            self.scheduler.remove_game(self.game_id)
+        self.reject_pending_actions('遊戲已結束，政策行動未執行')
         
         # 計算最終評分
         final_scores = self.calculate_final_scores()
         
+        self.final_scores = final_scores
+        
         # 發送遊戲結束通知
-        socketio.emit('game_ended', {
+        self.emit_to_room('game_ended', {
             'final_scores': final_scores,
-            'game_duration': self.current_quarter - 1
-        }, room=self.game_id)
+            'game_duration': self.current_quarter - 1,
+            'seed': self.seed
+        })
         
         self.add_log("🏁 遊戲結束！評分結算完成")
+        self.save_snapshot()
 
     def calculate_final_scores(self):
         """計算所有玩家的最終得分"""
         final_scores = []
+        score_results = scoring_system.score_all(self.players, self.current_quarter, self.history_stats)
         
         for player in self.players.values():
-            score_result = scoring_system.calculate_final_score(
-                player, self.players, self.current_quarter
-            )
+            score_result = score_results[player['id']]
             
             final_scores.append({
                 'player_id': player['id'],
@@ -425,13 +883,33 @@ class GameState:
         return final_scores
 
     def get_current_standings(self):
-        """獲取當前排名（用於中期預覽）"""
-        return self.calculate_final_scores()
+        """獲取當前排名（用於中期預覽）
+
+        排名在季度結束或政策行動後才重新計算；計算期間到達的其他請求
+        等待同一次結果，不會重複計算。
+        """
+        cached = self.standings_cache
+        if cached is not None and cached[0] == self.standings_version:
+            return cached[1]
+        
+        with self.standings_lock:
+            version = self.standings_version
+            cached = self.standings_cache
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            with self.state_lock():
+                standings = self.calculate_final_scores()
+            self.standings_cache = (version, standings)
+            return standings
+    
+    def invalidate_standings(self):
+        """評分輸入已變動，下次查詢時重新計算排名"""
+        self.standings_version += 1
         
     def update_global_oil_price(self):
         """更新全球石油價格"""
         # 基礎隨機波動 ±5%
-        base_change = random.uniform(-0.05, 0.05)
+        base_change = self.rng.oil.uniform(-0.05, 0.05)
         self.global_oil_price *= (1 + base_change)
         
         # 限制在合理範圍內 ($30-$150)
@@ -573,7 +1051,7 @@ class GameState:
     def update_china_passive(self, data, china_player):
         """中國被動技能：商業間諜"""
         # 20%機率觸發
-        if random.random() < 0.2:
+        if self.rng.passive.random() < 0.2:
             # 找到上一季GDP成長最高的國家
             best_gdp_country = None
             best_gdp_growth = -float('inf')
@@ -627,13 +1105,13 @@ class GameState:
     def update_brazil_passive(self, data):
         """巴西被動技能：大宗商品出口國"""
         # 60%機會+1.5%，40%機會-1.2%
-        if random.random() < 0.6:
+        if self.rng.passive.random() < 0.6:
             data['gdp_growth'] += 1.5
-            if random.random() < 0.1:  # 10%機率顯示訊息
+            if self.rng.passive.random() < 0.1:  # 10%機率顯示訊息
                 self.add_log("🇧🇷 巴西：大宗商品價格上漲，經濟受益")
         else:
             data['gdp_growth'] -= 1.2
-            if random.random() < 0.1:  # 10%機率顯示訊息
+            if self.rng.passive.random() < 0.1:  # 10%機率顯示訊息
                 self.add_log("🇧🇷 巴西：大宗商品價格下跌，經濟受損")
 
     def update_saudi_passive(self, data):
@@ -721,7 +1199,7 @@ class GameState:
     def check_oil_price_events(self):
         """檢查油價相關事件"""
         if self.global_oil_price > 120:
-            if random.random() < 0.1:  # 10%機率
+            if self.rng.oil.random() < 0.1:  # 10%機率
                 self.add_log("⚠️ 油價高漲引發全球通膨擔憂，央行面臨政策兩難")
                 # 所有國家通膨壓力增加
                 for player in self.players.values():
@@ -729,7 +1207,7 @@ class GameState:
                         player['country_data']['inflation_trend'] += 0.3
                         
         elif self.global_oil_price < 50:
-            if random.random() < 0.1:  # 10%機率
+            if self.rng.oil.random() < 0.1:  # 10%機率
                 self.add_log("📉 油價暴跌衝擊能源國經濟，通縮風險升溫")
                 # 石油出口國受衝擊
                 for player in self.players.values():
@@ -739,13 +1217,13 @@ class GameState:
                         
         # 極端油價警報
         if self.global_oil_price > 140:
-            if random.random() < 0.05:  # 5%機率
+            if self.rng.oil.random() < 0.05:  # 5%機率
                 self.add_log("🚨 油價飆破$140！全球經濟衰退風險急升")
                 for player in self.players.values():
                     player['country_data']['confidence_trend'] -= 10
                     
         elif self.global_oil_price < 35:
-            if random.random() < 0.05:  # 5%機率
+            if self.rng.oil.random() < 0.05:  # 5%機率
                 self.add_log("💥 油價崩盤至$35以下！能源企業面臨破產潮")
                 for player in self.players.values():
                     if player['country_code'] in ['SAU', 'BRA']:
@@ -753,11 +1231,54 @@ class GameState:
 
     def add_log(self, message):
         """添加遊戲日誌"""
+        # 緩衝區已滿時，最舊的一筆即將被擠出
+        if game_log_archive is not None and len(self.game_log) == self.game_log.maxlen:
+            game_log_archive.append(self.game_id, self.game_log[0])
+        
+        self.log_seq += 1
         self.game_log.append({
+            'seq': self.log_seq,
             'quarter': self.current_quarter,
             'message': message,
             'timestamp': time.time()
         })
+    
+    def get_recent_log(self, count):
+        """取得最新的幾筆日誌"""
+        return list(islice(self.game_log, max(0, len(self.game_log) - count), None))
+    
+    def get_log_since(self, seq):
+        """取得序號大於 seq 的日誌（仍在緩衝區內者）"""
+        return self.get_recent_log(min(self.log_seq - seq, len(self.game_log)))
+    
+    def take_new_log_entries(self):
+        """取得上一次季度推播之後新增的日誌"""
+        entries = self.get_log_since(self.broadcast_log_seq)
+        self.broadcast_log_seq = self.log_seq
+        return entries
+    
+    def fetch_log(self, after_seq, limit):
+        """分頁查詢序號大於 after_seq 的日誌"""
+        limit = max(1, min(limit, LOG_PAGE_LIMIT))
+        entries = []
+        
+        # 早於緩衝區的日誌從封存檔讀取
+        oldest_seq = self.game_log[0]['seq'] if self.game_log else self.log_seq + 1
+        if after_seq + 1 < oldest_seq and game_log_archive is not None:
+            entries.extend(game_log_archive.read(self.game_id, after_seq, limit))
+        
+        for entry in self.game_log:
+            if len(entries) >= limit:
+                break
+            if entry['seq'] > after_seq and (not entries or entry['seq'] > entries[-1]['seq']):
+                entries.append(entry)
+        
+        next_seq = entries[-1]['seq'] if entries else after_seq
+        return {
+            'entries': entries,
+            'next_after_seq': next_seq,
+            'has_more': next_seq < self.log_seq
+        }
 
     def check_global_bubble_risk(self):
         """檢查全球股市泡沫風險"""
@@ -775,12 +1296,16 @@ class GameState:
             
             # 🆕 添加除錯訊息 - 顯示報酬率
             if return_rate > 10:
-                print(f"🎯 {player['country_name']} 股價報酬率: +{return_rate:.1f}%, 泡沫機率: {bubble_probability*100:.1f}%")
+                bubble_logger.debug("🎯 %s 股價報酬率: +%.1f%%, 泡沫機率: %.1f%%",
+                                    player['country_name'], return_rate, bubble_probability * 100)
             
             # 檢查是否觸發泡沫破裂
-            if random.random() < bubble_probability:
-                print(f"💥 觸發泡沫破裂！{player['country_name']} 報酬率: +{return_rate:.1f}%")
+            if self.rng.bubble.random() < bubble_probability:
+                bubble_logger.info("💥 觸發泡沫破裂！%s 報酬率: +%.1f%%", player['country_name'], return_rate,
+                                   extra={'game_id': self.game_id})
                 bubble_event = self.trigger_bubble_burst(player)
+                if not self.headless:
+                    metrics.bubble_bursts.inc()
                 if bubble_event:
                     triggered_bubbles.append(bubble_event)
                     
@@ -794,7 +1319,6 @@ class GameState:
         # 記錄破裂前的指數和報酬率
         original_index = country_data['stock_index']
         original_return = original_index - 100
-        print(f"💥 {country_name} 泡沫破裂前報酬率: +{original_return:.1f}% (指數: {original_index:.1f})")
         
         # 🔧 計算泡沫破裂程度 - 基於報酬率
         return_rate = original_index - 100
@@ -804,15 +1328,14 @@ class GameState:
         # 🔧 基礎跌幅20% + 泡沫嚴重度（確保明顯的跌幅）
         total_crash = 0.20 + bubble_severity
         
-        print(f"💥 {country_name} 計算跌幅: 基礎20% + 額外{bubble_severity*100:.1f}% = 總計{total_crash*100:.1f}%")
-        
         # 🔧 立即影響股市 - 確保明顯跌幅
         country_data['stock_index'] *= (1 - total_crash)
         new_index = country_data['stock_index']
         new_return = new_index - 100
         
-        print(f"💥 {country_name} 泡沫破裂後報酬率: {new_return:+.1f}% (指數: {new_index:.1f})")
-        print(f"💥 {country_name} 實際跌幅: {((original_index-new_index)/original_index)*100:.1f}%")
+        bubble_logger.debug("💥 %s 泡沫破裂: 報酬率 %+.1f%% → %+.1f%%（基礎20%% + 額外%.1f%%，指數 %.1f → %.1f）",
+                            country_name, original_return, new_return, bubble_severity * 100,
+                            original_index, new_index)
         
         # 對經濟的立即衝擊（放大影響）
         gdp_impact = -total_crash * 10  # 增強GDP影響
@@ -853,11 +1376,12 @@ class GameState:
         data = player['country_data']
         
         # 基礎經濟變化
-        data['gdp_growth'] += random.uniform(-0.3, 0.3)
-        data['inflation'] += random.uniform(-0.2, 0.2)
-        data['unemployment'] += random.uniform(-0.3, 0.3)
-        data['confidence'] += random.uniform(-2, 2)
-        data['stock_index'] += random.uniform(-3, 3)
+        gdp_noise, inflation_noise, unemployment_noise, confidence_noise, stock_noise = self._draw_quarter_noise()
+        data['gdp_growth'] += gdp_noise
+        data['inflation'] += inflation_noise
+        data['unemployment'] += unemployment_noise
+        data['confidence'] += confidence_noise
+        data['stock_index'] += stock_noise
         
         # 應用趨勢
         data['gdp_growth'] += data.get('gdp_trend', 0)
@@ -880,6 +1404,22 @@ class GameState:
         data['confidence_trend'] *= 0.7
         data['stock_index_trend'] *= 0.7
         
+        self._record_quarter_history(player)
+    
+    def _draw_quarter_noise(self):
+        """季度隨機波動（GDP、通膨、失業、信心、股價）"""
+        return (
+            self.rng.economics.uniform(-0.3, 0.3),
+            self.rng.economics.uniform(-0.2, 0.2),
+            self.rng.economics.uniform(-0.3, 0.3),
+            self.rng.economics.uniform(-2, 2),
+            self.rng.economics.uniform(-3, 3)
+        )
+    
+    def _record_quarter_history(self, player):
+        """記錄季度歷史並減少技能冷卻"""
+        data = player['country_data']
+        
         # 更新歷史記錄
         history = data['history']
         history['quarters'].append(self.current_quarter)
@@ -999,76 +1539,163 @@ COUNTRY_CONFIGS = {
     }
 }
 
+def restore_games():
+    """伺服器啟動時由快照與日誌還原所有遊戲並恢復計時"""
+    if game_persistence is None:
+        return 0
+    
+    started = time.time()
+    restored = 0
+    for snapshot, records in game_persistence.load_all():
+        try:
+            game = GameState.from_snapshot(snapshot, records)
+        except (KeyError, TypeError, ValueError) as e:
+            game_logger.warning("⚠️ 遊戲還原失敗: %s", e)
+            continue
+        game.attach_runtime()
+        game_actors.spawn(game.game_id)
+        games[game.game_id] = game
+        room_allocator.reserve(game.game_id)
+        restored += 1
+    
+    if restored:
+        game_logger.info("♻️ 已還原 %d 場遊戲，耗時 %.1f ms", restored, (time.time() - started) * 1000)
+        start_timer_thread()
+    return restored
+
 def start_timer_thread():
     """啟動計時器執行緒"""
     global timer_thread
     if timer_thread is None or not timer_thread.is_alive():
         timer_thread = threading.Thread(target=game_timer, daemon=True)
         timer_thread.start()
-        print("遊戲計時器執行緒已啟動")
+        timer_logger.info("遊戲計時器執行緒已啟動")
+    game_lifecycle.start()
 
 def game_timer():
-    """遊戲計時器（背景執行緒）"""
-    print("遊戲計時器開始運行")
+    """遊戲計時器（背景執行緒）：睡到最早的截止時間再處理到期的遊戲"""
+    timer_logger.info("遊戲計時器開始運行")
     while True:
+        due = game_scheduler.wait_due()
+        iteration_started = time.perf_counter()
+        due_kinds = {}  # game_id: 到期的種類（frame / quarter）
+        for game_id, kind in due:
+            due_kinds.setdefault(game_id, set()).add(kind)
+        
+        # 各遊戲的實時更新、季度推進與送出交給該遊戲的 actor
+        for game_id, kinds in due_kinds.items():
+            game = games.get(game_id)
+            if game is None:
+                continue
+            try:
+                game_actors.post(game_id, run_due_timers, game, 'frame' in kinds, 'quarter' in kinds)
+            except ActorClosed:
+                pass  # 遊戲回收中
+        
+        metrics.timer_iteration_seconds.observe(time.perf_counter() - iteration_started)
+
+def run_due_timers(game, frame_due, quarter_due):
+    """在遊戲的 actor 上處理到期的實時幀與季度，處理完才排入下一次"""
+    game_id = game.game_id
+    if frame_due:
         try:
-            time.sleep(0.5)
-            
-            for game_id, game in list(games.items()):
-                if not game.game_started or game.is_paused:
-                    continue
-                    
-                # 實時更新經濟指標
-                for player_id, player in game.players.items():
-                    update_realtime_economics(player['country_data'])
-                    
-                # 檢查是否需要推進季度
-                if game.get_quarter_progress() >= 1.0:
-                    triggered_events = game.advance_quarter()
-                    
-                    print(f"📊 game_timer 收到事件: {type(triggered_events)}, 內容: {triggered_events}")
-                    
-                    socketio.emit('quarter_advanced', {
-                        'quarter': game.current_quarter,
-                        'players': list(game.players.values()),
-                        'game_log': game.game_log[-3:],
-                        'full_game_log': game.game_log,
-                        'global_oil_price': game.global_oil_price,
-                        'triggered_events': triggered_events  # 確保這是列表
-                    }, room=game_id)
-                
-                # 更新政策冷卻時間
-                current_time = time.time()
-                players_data = []
-                
-                for player_id, player in game.players.items():
-                    cooldowns = player['country_data']['policy_cooldowns']
-                    cooldown_status = {}
-                    
-                    # 全局政策冷卻
-                    global_remaining = max(0, cooldowns.get('global_policy_cooldown', 0) - current_time)
-                    cooldown_status['global_policy_cooldown'] = global_remaining
-                    
-                    # 主動技能季度冷卻
-                    cooldown_status['active_skill'] = cooldowns.get('active_skill', 0)
-                    
-                    players_data.append({
-                        'player_id': player_id,
-                        'cooldown_status': cooldown_status
-                    })
-                
-                # 發送實時更新
-                socketio.emit('realtime_update', {
-                    'progress': game.get_quarter_progress(),
-                    'remaining_time': game.get_remaining_time(),
-                    'players_cooldowns': players_data,
-                    'players': list(game.players.values()),
-                    'global_oil_price': game.global_oil_price
-                }, room=game_id)
-                
-        except Exception as e:
-            print(f"計時器執行錯誤: {e}")
-            continue
+            game.tick_realtime()
+        except Exception:
+            timer_logger.exception("計時器執行錯誤", extra={'game_id': game_id})
+    
+    # 推進到期的季度
+    if quarter_due and game.is_ticking():
+        try:
+            advance_game_quarter(game)
+        except Exception:
+            timer_logger.exception("計時器執行錯誤", extra={'game_id': game_id})
+        if game.is_ticking():
+            game_scheduler.schedule_quarter(game_id, game.get_quarter_deadline())
+    
+    # 套用本幀排隊的政策行動，發送實時更新並排入下一幀
+    if frame_due and game.is_ticking():
+        try:
+            apply_pending_actions(game)
+            emit_realtime_frame(game)
+        except Exception:
+            timer_logger.exception("計時器執行錯誤", extra={'game_id': game_id})
+        game_scheduler.schedule_frame(game_id)
+
+def advance_game_quarter(game):
+    """推進季度並通知房間"""
+    started = time.perf_counter()
+    with game.state_lock():
+        triggered_events = game.advance_quarter()
+    
+    outbound.emit(game.game_id, 'quarter_advanced', build_quarter_payload(game, triggered_events))
+    metrics.advance_quarter_seconds.observe(time.perf_counter() - started)
+
+def build_quarter_payload(game, triggered_events):
+    """組成 quarter_advanced 的資料（會標記本季日誌已送出）"""
+    return {
+        'quarter': game.current_quarter,
+        'players': game.players_fragment('quarter_advanced'),
+        'game_log': game.get_recent_log(3),
+        'new_game_log': game.take_new_log_entries(),
+        'log_seq': game.log_seq,
+        'global_oil_price': game.global_oil_price,
+        'standings': game.quarter_scores.get(game.current_quarter),  # 本季結算的排名
+        'triggered_events': triggered_events  # 確保這是列表
+    }
+
+def emit_realtime_frame(game):
+    """發送實時更新幀（進度、冷卻與玩家差異）"""
+    outbound.emit(game.game_id, 'realtime_update', build_realtime_frame(game))
+
+def build_realtime_frame(game):
+    """組成 realtime_update 的資料（會推進實時序號）"""
+    # 更新政策冷卻時間
+    current_time = time.time()
+    players_data = []
+    
+    for player_id, player in game.players.items():
+        cooldowns = player['country_data']['policy_cooldowns']
+        cooldown_status = {}
+        
+        # 全局政策冷卻
+        global_remaining = max(0, cooldowns.get('global_policy_cooldown', 0) - current_time)
+        cooldown_status['global_policy_cooldown'] = global_remaining
+        
+        # 主動技能季度冷卻
+        cooldown_status['active_skill'] = cooldowns.get('active_skill', 0)
+        
+        players_data.append({
+            'player_id': player_id,
+            'cooldown_status': cooldown_status
+        })
+    
+    # 發送實時更新（只送出變動欄位）
+    if game.engine is not None:
+        game.engine.materialize(game.game_id)
+    frame = game.build_realtime_delta()
+    frame.update({
+        'progress': game.get_quarter_progress(),
+        'remaining_time': game.get_remaining_time(),
+        'players_cooldowns': players_data,
+        'global_oil_price': game.global_oil_price
+    })
+    return frame
+
+def copy_state(value):
+    """複製玩家狀態（巢狀 dict / list 需要深拷貝，CountryState 轉為字典）"""
+    if isinstance(value, (dict, CountryState)):
+        return {key: copy_state(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_state(item) for item in value]
+    return value
+
+def diff_state(previous, current):
+    """比較兩份狀態，回傳有變動的欄位"""
+    changes = {}
+    for key, value in current.items():
+        if key not in previous or previous[key] != value:
+            changes[key] = value
+    return changes
 
 def update_realtime_economics(country_data):
     """實時更新經濟指標（季度內持續變化）"""
@@ -1091,12 +1718,113 @@ def update_realtime_economics(country_data):
 def index():
     return render_template('index.html')
 
+@app.route('/shard')
+def shard_info():
+    """目前行程的分片資訊"""
+    info = shard_config.to_dict()
+    info['games'] = len(games)
+    return jsonify(info)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 文字格式的伺服器指標"""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+def count_games_by_state():
+    """依狀態統計遊戲數（抓取 /metrics 時計算）"""
+    counts = {('lobby',): 0, ('running',): 0, ('paused',): 0, ('finished',): 0}
+    for game in list(games.values()):
+        if game.final_scores is not None:
+            state = 'finished'
+        elif not game.game_started:
+            state = 'lobby'
+        elif game.is_paused:
+            state = 'paused'
+        else:
+            state = 'running'
+        counts[(state,)] += 1
+    return counts
+
+metrics.registry.gauge('games', '目前的遊戲數（依狀態）', count_games_by_state, ['state'])
+metrics.registry.gauge('outbound_pending_messages', '各房間送出佇列中尚未送出的訊息數', outbound.pending)
+metrics.registry.gauge('connected_sids', '目前連線的 Socket.IO 連線數', lambda: len(players))
+metrics.registry.gauge('game_players', '所有遊戲的玩家總數', lambda: sum(len(game.players) for game in list(games.values())))
+
+def allocate_game_id():
+    """配置屬於本分片且未使用的房間代碼（用完時回傳 None）"""
+    return room_allocator.allocate()
+
+def close_game(game, reason):
+    """回收遊戲（在遊戲的 actor 上執行）：釋放資源並通知仍在房間內的客戶端，
+    移除 actor 後才移除遊戲並歸還房間代碼"""
+    game.release()
+    metrics.games_evicted.inc(1, reason)
+    # 仍在房間內的連線不再屬於這場遊戲（房間代碼之後可能配置給新遊戲）
+    for player_info in list(players.values()):
+        if player_info.get('game_id') == game.game_id:
+            player_info['game_id'] = None
+    outbound.emit(game.game_id, 'game_closed', {'game_id': game.game_id, 'reason': reason})
+    outbound.close_room(game.game_id)
+    game_actors.remove(game.game_id)  # 之後對此遊戲的指令一律拒絕
+    game_lifecycle.complete_eviction(game, reason)
+
+def evict_game(game, reason):
+    """回收遊戲：在遊戲的 actor 上關閉（排在已投遞的指令之後）"""
+    try:
+        game_actors.post(game.game_id, close_game, game, reason)
+    except ActorClosed:
+        close_game(game, reason)  # 沒有 actor（未經伺服器建立的遊戲），直接關閉
+
+# 房間代碼配置與閒置／已結束遊戲回收
+room_allocator = RoomIdAllocator(shard_config.owns)
+game_lifecycle = GameLifecycleManager(
+    games, room_allocator,
+    idle_timeout=float(os.environ.get('GAME_IDLE_TIMEOUT', 300)),
+    retention=float(os.environ.get('GAME_RETENTION', 600)),
+    archive_dir=os.environ.get('GAME_ARCHIVE_DIR'),
+    on_evict=evict_game
+)
+
+def redirect_to_owner_shard(game_id):
+    """遊戲不屬於本分片時，通知客戶端改連負責的分片"""
+    if not shard_config.enabled or shard_config.owns(game_id):
+        return False
+    
+    url = shard_config.owner_url(game_id)
+    if url is None:
+        emit('error', {'message': '找不到負責此房間的伺服器'})
+    else:
+        emit('shard_redirect', {'game_id': game_id, 'url': url})
+    return True
+
+def join_game_room(game_id):
+    """目前連線加入遊戲房間（二進位格式的客戶端加入對應的二進位房間）"""
+    if players[request.sid].get('wire') == BINARY_WIRE:
+        join_room(binary_room(game_id))
+    else:
+        join_room(game_id)
+
+@socketio.on_error_default
+def on_socket_error(error):
+    """事件處理錯誤：遊戲回收中回覆錯誤訊息，其餘記錄日誌"""
+    if isinstance(error, ActorClosed):
+        emit('error', {'message': '遊戲房間已關閉'})
+        return
+    event = getattr(request, 'event', None) or {}
+    socket_logger.error("事件處理錯誤: %s", event.get('message'), exc_info=(type(error), error, error.__traceback__))
+
 @socketio.on('connect')
-def on_connect():
+def on_connect(auth=None):
     player_id = str(uuid.uuid4())
-    players[request.sid] = {'id': player_id}
-    emit('connected', {'player_id': player_id})
-    print(f"玩家連接: {request.sid}, ID: {player_id}")
+    # 客戶端可在連線時要求二進位格式（伺服器未安裝 msgpack 時維持 JSON）
+    requested = (auth or {}).get('wire') if isinstance(auth, dict) else None
+    wire = BINARY_WIRE if requested == BINARY_WIRE and binary_available() else 'json'
+    players[request.sid] = {'id': player_id, 'wire': wire}
+    connected = {'player_id': player_id, 'wire': wire}
+    if wire == BINARY_WIRE:
+        connected['indicator_fields'] = INDICATOR_FIELDS  # 指標列的欄位順序
+    emit('connected', connected)
+    socket_logger.info("玩家連接: %s, ID: %s", request.sid, player_id)
     
     # 確保計時器執行緒運行
     start_timer_thread()
@@ -1105,20 +1833,30 @@ def on_connect():
 def on_disconnect():
     if request.sid in players:
         player_info = players[request.sid]
-        print(f"玩家斷線: {request.sid}")
+        socket_logger.info("玩家斷線: %s", request.sid)
         
         if 'game_id' in player_info:
             game_id = player_info['game_id']
             if game_id in games:
-                game = games[game_id]
-                if player_info['id'] in game.players:
-                    game.players[player_info['id']]['connected'] = False
+                try:
+                    game_actors.post(game_id, mark_disconnected, games[game_id], player_info['id'])
+                except ActorClosed:
+                    pass  # 遊戲回收中
         
         del players[request.sid]
 
+def mark_disconnected(game, player_id):
+    """玩家斷線（在遊戲的 actor 上執行）"""
+    if player_id in game.players:
+        game.players[player_id]['connected'] = False
+        game.touch()
+
 @socketio.on('create_game')
 def on_create_game(data):
-    game_id = str(random.randint(1000, 9999))
+    game_id = allocate_game_id()
+    if game_id is None:
+        emit('error', {'message': '伺服器房間已滿，請稍後再試'})
+        return
     player_name = data['player_name']
     country_code = data['country_code']
     
@@ -1128,6 +1866,7 @@ def on_create_game(data):
     # 創建遊戲
     game = GameState(game_id, player_id)
     game.add_player(player_id, player_name, country_code)
+    game_actors.spawn(game_id)
     games[game_id] = game
     
     # 更新玩家信息
@@ -1137,14 +1876,15 @@ def on_create_game(data):
         'country_code': country_code
     })
     
-    join_room(game_id)
+    join_game_room(game_id)
     
     emit('game_created', {
         'game_id': game_id,
-        'player_data': game.players[player_id]
+        'player_data': project_player(game.players[player_id], 'game_created'),
+        'rejoin_token': game.players[player_id]['rejoin_token']
     })
     
-    print(f"遊戲創建: {game_id}, 房主: {player_name} ({country_code})")
+    game_logger.info("遊戲創建，房主: %s (%s)", player_name, country_code, extra={'game_id': game_id})
 
 @socketio.on('join_game')
 def on_join_game(data):
@@ -1152,23 +1892,23 @@ def on_join_game(data):
     player_name = data['player_name']
     country_code = data['country_code']
     
+    # 遊戲由其他分片負責
+    if redirect_to_owner_shard(game_id):
+        return
+    
     if game_id not in games:
         emit('error', {'message': '遊戲房間不存在'})
         return
     
     game = games[game_id]
-    
-    # 檢查國家是否已被選擇
-    for existing_player in game.players.values():
-        if existing_player['country_code'] == country_code:
-            emit('error', {'message': '此國家已被其他玩家選擇'})
-            return
-    
     player_info = players[request.sid]
     player_id = player_info['id']
     
-    # 添加玩家到遊戲
-    game.add_player(player_id, player_name, country_code)
+    # 檢查國家並添加玩家到遊戲（在遊戲的 actor 上執行）
+    joined = game_actors.call(game_id, join_game_state, game, player_id, player_name, country_code)
+    if joined is None:
+        emit('error', {'message': '此國家已被其他玩家選擇'})
+        return
     
     # 更新玩家信息
     player_info.update({
@@ -1177,19 +1917,118 @@ def on_join_game(data):
         'country_code': country_code
     })
     
-    join_room(game_id)
+    join_game_room(game_id)
     
-    print(f"玩家加入遊戲 {game_id}")
+    game_logger.info("玩家加入遊戲", extra={'game_id': game_id})
+    
+    # 座位密鑰只送給加入的玩家（排在 player_joined 之前）
+    outbound.emit(game_id, 'seat_assigned', {
+        'game_id': game_id,
+        'rejoin_token': joined['rejoin_token']
+    }, to=request.sid)
+    outbound.emit(game_id, 'player_joined', joined['player_joined'])
     
-    socketio.emit('player_joined', {
-        'player_data': game.players[players[request.sid]['id']],
-        'all_players': list(game.players.values())
-    }, room=game_id)
+    # 新加入的玩家以完整快照作為實時更新的基準（排在 player_joined 之後，名冊先到）
+    outbound.emit(game_id, 'realtime_update', joined['snapshot'], to=request.sid)
+
+def join_game_state(game, player_id, player_name, country_code):
+    """加入玩家並組成通知資料（國家已被選擇時回傳 None）"""
+    for existing_player in game.players.values():
+        if existing_player['country_code'] == country_code:
+            return None
+    
+    game.add_player(player_id, player_name, country_code)
+    return {
+        'player_joined': {
+            'player_data': project_player(game.players[player_id], 'player_joined'),
+            'all_players': project_players(game.players.values(), 'player_joined')
+        },
+        'rejoin_token': game.players[player_id]['rejoin_token'],
+        'snapshot': game.build_realtime_snapshot()
+    }
+
+@socketio.on('request_resync')
+def on_request_resync():
+    """客戶端序號不連續時，重新送出完整快照"""
+    if request.sid not in players:
+        return
+        
+    game_id = players[request.sid].get('game_id')
+    if game_id not in games:
+        return
+        
+    # 經由房間的送出佇列，排在已排入的差異幀之後
+    snapshot = game_actors.call(game_id, games[game_id].build_realtime_snapshot)
+    outbound.emit(game_id, 'realtime_update', snapshot, to=request.sid)
+
+@socketio.on('rejoin_game')
+def on_rejoin_game(data):
+    """斷線或伺服器重啟後，以原本的玩家 ID 與座位密鑰回到遊戲"""
+    if not isinstance(data, dict):
+        emit('rejoin_failed', {'message': '重新連線資料格式錯誤'})
+        return
+    game_id = data.get('game_id')
+    player_id = data.get('player_id')
+    rejoin_token = data.get('rejoin_token')
+    if not all(isinstance(value, str) for value in (game_id, player_id, rejoin_token)):
+        emit('rejoin_failed', {'message': '重新連線資料格式錯誤'})
+        return
+    
+    if redirect_to_owner_shard(game_id):
+        return
+    
+    game = games.get(game_id)
+    if game is None or player_id not in game.players:
+        emit('rejoin_failed', {'message': '遊戲已不存在'})
+        return
+    
+    if not secrets.compare_digest(game.players[player_id]['rejoin_token'], rejoin_token):
+        emit('rejoin_failed', {'message': '無法驗證玩家身分'})
+        return
+    
+    rejoined = game_actors.call(game_id, rejoin_game_state, game, player_id)
+    if rejoined is None:
+        emit('rejoin_failed', {'message': '此玩家仍在線上'})
+        return
+    
+    player = game.players[player_id]
+    players[request.sid].update({  # 保留連線時協商的資料格式
+        'id': player_id,
+        'game_id': game_id,
+        'name': player['name'],
+        'country_code': player['country_code']
+    })
+    join_game_room(game_id)
+    
+    # 經由房間的送出佇列，排在已排入的差異幀之後
+    outbound.emit(game_id, 'game_rejoined', rejoined['game_rejoined'], to=request.sid)
+    outbound.emit(game_id, 'realtime_update', rejoined['snapshot'], to=request.sid)
+
+def rejoin_game_state(game, player_id):
+    """標記玩家重新連線並組成回覆資料（玩家仍在線上時回傳 None）"""
+    player = game.players[player_id]
+    if player['connected']:
+        return None
+    
+    player['connected'] = True
+    game.touch()
+    return {
+        'game_rejoined': {
+            'game_id': game.game_id,
+            'player_id': player_id,
+            'is_host': player_id == game.host_player_id,
+            'game_started': game.game_started,
+            'player_data': project_player(player, 'game_rejoined'),
+            'all_players': project_players(game.players.values(), 'game_rejoined'),
+            'game_log': game.get_recent_log(10)
+        },
+        'snapshot': game.build_realtime_snapshot()
+    }
 
 @socketio.on('start_game')
 def on_start_game():
     """開始遊戲"""
-    print(f"開始遊戲請求，session: {request.sid}")
+    socket_logger.debug("開始遊戲請求，session: %s", request.sid)
     
     if request.sid not in players:
         emit('error', {'message': '用戶未連接'})
@@ -1208,14 +2047,20 @@ def on_start_game():
         emit('error', {'message': '只有房主可以開始遊戲'})
         return
     
-    print(f"房主開始遊戲 {game_id}")
+    game_logger.info("房主開始遊戲", extra={'game_id': game_id})
+    snapshot = game_actors.call(game_id, start_game_state, game)
+    outbound.emit(game_id, 'game_started', {})
+    outbound.emit(game_id, 'realtime_update', snapshot)
+
+def start_game_state(game):
+    """開始遊戲並回傳實時完整快照"""
     game.start_game()
-    socketio.emit('game_started', {}, room=game_id)
+    return game.build_realtime_snapshot()
 
 @socketio.on('policy_action')
 def on_policy_action(data):
     """處理政策行動 - 統一冷卻系統"""
-    print(f"政策行動: {data}")
+    policy_logger.debug("政策行動: %s", data)
     
     if request.sid not in players:
         return
@@ -1226,75 +2071,116 @@ def on_policy_action(data):
     if game_id not in games:
         return
         
-    game = games[game_id]
-    player = game.players[player_info['id']]
-    
+    game_actors.post(game_id, submit_policy_action, games[game_id], request.sid, player_info['id'], data)
+
+def submit_policy_action(game, sid, player_id, data):
+    """在遊戲的 actor 上排入政策行動；計時器未處理此遊戲（大廳、暫停或已結束）時直接套用"""
+    game.queue_action(sid, player_id, data)
+    if not game.is_ticking():
+        apply_pending_actions(game)
+
+def pause_game_state(game):
+    """先套用暫停前排隊的政策行動，再暫停遊戲"""
+    if game.is_ticking():
+        apply_pending_actions(game)
+    return game.pause_game()
+
+def apply_pending_actions(game):
+    """依到達順序套用排隊的政策行動，成功的行動合併成一則 game_update，失敗只回傳給發送者"""
+    applied = []
+    log_seq = game.log_seq  # 本批行動產生的日誌都在此序號之後
+    while game.pending_actions:
+        sid, player_id, data, received_at = game.pending_actions.popleft()
+        player = game.players.get(player_id)
+        if player is None:
+            continue
+        try:
+            success, message = apply_policy_action(game, player, data, received_at)
+        except (KeyError, TypeError, ValueError) as e:
+            policy_logger.warning("政策行動格式錯誤: %s", e, extra={'game_id': game.game_id})
+            success, message = False, '政策行動格式錯誤'
+        if success:
+            applied.append({'player_id': player_id, 'action_type': data['action_type'], 'message': message})
+        else:
+            outbound.emit(game.game_id, 'error', {'message': message}, to=sid)
+    
+    if applied:
+        outbound.emit(game.game_id, 'game_update', {
+            'players': game.players_fragment('game_update'),
+            'game_log': game.get_log_since(log_seq),
+            'global_oil_price': game.global_oil_price,
+            'actions': applied
+        })
+
+def apply_policy_action(game, player, data, current_time=None):
+    """檢查冷卻並執行政策行動，回傳 (是否成功, 訊息)"""
     action_type = data['action_type']
     cooldowns = player['country_data']['policy_cooldowns']
-    current_time = time.time()
+    if current_time is None:
+        current_time = time.time()
     
     # 檢查主動技能冷卻（季度冷卻）
     if action_type in ['taiwan_bet', 'brazil_anticorruption', 'saudi_transformation', 
                        'usa_trade_war', 'china_mass_mobilization', 'japan_aging_solution']:
         skill_cooldown = cooldowns.get('active_skill', 0)
         if skill_cooldown > 0:
-            emit('error', {'message': f'{get_policy_name(action_type)}冷卻中，還需等待 {skill_cooldown} 季'})
-            return
+            return False, f'{get_policy_name(action_type)}冷卻中，還需等待 {skill_cooldown} 季'
     else:
         # 檢查全局政策冷卻（10秒統一冷卻）
         if current_time < cooldowns.get('global_policy_cooldown', 0):
             remaining = int(cooldowns['global_policy_cooldown'] - current_time)
-            emit('error', {'message': f'政策冷卻中，還需等待 {remaining} 秒才能發動下個政策'})
-            return
+            return False, f'政策冷卻中，還需等待 {remaining} 秒才能發動下個政策'
+    
+    # 處理各種政策（向量引擎啟用時先同步狀態）
+    with game.state_lock():
+        success, message = dispatch_policy_action(game, player, data)
+    
+    if success:
+        # 設置冷卻時間
+        if action_type in ['taiwan_bet', 'brazil_anticorruption', 'saudi_transformation', 
+                           'usa_trade_war', 'china_mass_mobilization', 'japan_aging_solution']:
+            # 主動技能冷卻在各自的處理函數中設置
+            pass
+        else:
+            # 設置統一的10秒全局政策冷卻
+            cooldowns['global_policy_cooldown'] = current_time + 10
+        
+        game.add_log(f"{player['name']}: {message}")
+        game.record_action(player['id'], data, current_time)
+        game.invalidate_standings()
     
-    success = False
-    message = ""
+    return success, message
+
+def dispatch_policy_action(game, player, data):
+    """依行動類型呼叫對應的政策處理函數"""
+    action_type = data['action_type']
     
-    # 處理各種政策
     if action_type == 'interest_rate':
-        success, message = handle_interest_rate_change(player, data['value'])
+        return handle_interest_rate_change(player, data['value'])
     elif action_type == 'reserve_ratio':
-        success, message = handle_reserve_ratio_change(player, data['value'])
+        return handle_reserve_ratio_change(player, data['value'])
     elif action_type == 'fiscal_policy':
-        success, message = handle_fiscal_policy(player, data['policy_type'])
+        return handle_fiscal_policy(player, data['policy_type'])
     elif action_type == 'quantitative_easing':
-        success, message = handle_quantitative_easing(player, data['direction'])
+        return handle_quantitative_easing(player, data['direction'])
     elif action_type == 'cash_distribution':
-        success, message = handle_cash_distribution(player)
+        return handle_cash_distribution(player)
     elif action_type == 'taiwan_bet':
-        success, message = handle_taiwan_bet(player, data.get('target_country'))
+        return handle_taiwan_bet(player, data.get('target_country'))
     elif action_type == 'brazil_anticorruption':
-        success, message = handle_brazil_anticorruption(player)
+        return handle_brazil_anticorruption(player)
     elif action_type == 'saudi_transformation':
-        success, message = handle_saudi_transformation(player)
+        return handle_saudi_transformation(player)
     elif action_type == 'oil_control':
-        success, message = handle_oil_control(game, player, data.get('direction'))
+        return handle_oil_control(game, player, data.get('direction'))
     elif action_type == 'usa_trade_war':
-        success, message = handle_usa_trade_war(game, player, data.get('target_country'))
+        return handle_usa_trade_war(game, player, data.get('target_country'))
     elif action_type == 'china_mass_mobilization':
-        success, message = handle_china_mass_mobilization(player)
+        return handle_china_mass_mobilization(player)
     elif action_type == 'japan_aging_solution':
-        success, message = handle_japan_aging_solution(player)
+        return handle_japan_aging_solution(player)
     
-    if success:
-        # 設置冷卻時間
-        if action_type in ['taiwan_bet', 'brazil_anticorruption', 'saudi_transformation', 
-                           'usa_trade_war', 'china_mass_mobilization', 'japan_aging_solution']:
-            # 主動技能冷卻在各自的處理函數中設置
-            pass
-        else:
-            # 設置統一的10秒全局政策冷卻
-            cooldowns['global_policy_cooldown'] = current_time + 10
-        
-        game.add_log(f"{player['name']}: {message}")
-        
-        socketio.emit('game_update', {
-            'players': list(game.players.values()),
-            'game_log': game.game_log[-5:],
-            'global_oil_price': game.global_oil_price
-        }, room=game_id)
-    else:
-        emit('error', {'message': message})
+    return False, "未知的政策類型"
 
 @socketio.on('request_standings')
 def on_request_standings():
@@ -1309,13 +2195,35 @@ def on_request_standings():
         return
         
     game = games[game_id]
-    standings = game.get_current_standings()
+    standings = game_actors.call(game_id, game.get_current_standings)
     
     emit('standings_update', {
         'standings': standings,
         'quarter': game.current_quarter
     })
 
+@socketio.on('fetch_log')
+def on_fetch_log(data):
+    """分頁查詢較舊的遊戲日誌"""
+    if request.sid not in players:
+        return
+        
+    game_id = players[request.sid].get('game_id')
+    if game_id not in games:
+        return
+    
+    data = data or {}
+    if not isinstance(data, dict):
+        emit('error', {'message': '日誌查詢格式錯誤'})
+        return
+    try:
+        after_seq = int(data.get('after_seq', 0))
+        limit = int(data.get('limit', LOG_PAGE_LIMIT))
+    except (TypeError, ValueError, OverflowError):
+        emit('error', {'message': '日誌查詢格式錯誤'})
+        return
+    emit('log_page', game_actors.call(game_id, games[game_id].fetch_log, after_seq, limit))
+
 @socketio.on('set_game_duration')
 def on_set_game_duration(data):
     """設定遊戲持續時間"""
@@ -1337,10 +2245,56 @@ def on_set_game_duration(data):
     
     duration = data.get('quarters', 17)
     if 8 <= duration <= 32:
-        game.game_duration_quarters = duration
-        socketio.emit('game_duration_set', {
+        game_actors.call(game_id, game.set_duration, duration)
+        
+        outbound.emit(game_id, 'game_duration_set', {
             'quarters': duration
-        }, room=game_id)
+        })
+
+@socketio.on('pause_game')
+def on_pause_game():
+    """暫停遊戲（僅房主）"""
+    if request.sid not in players:
+        return
+        
+    player_info = players[request.sid]
+    game_id = player_info.get('game_id')
+    
+    if game_id not in games:
+        return
+        
+    game = games[game_id]
+    
+    if player_info['id'] != game.host_player_id:
+        emit('error', {'message': '只有房主可以暫停遊戲'})
+        return
+    
+    if game_actors.call(game_id, pause_game_state, game):
+        outbound.emit(game_id, 'game_paused', {
+            'progress': game.get_quarter_progress(),
+            'remaining_time': game.get_remaining_time()
+        })
+
+@socketio.on('resume_game')
+def on_resume_game():
+    """恢復遊戲（僅房主）"""
+    if request.sid not in players:
+        return
+        
+    player_info = players[request.sid]
+    game_id = player_info.get('game_id')
+    
+    if game_id not in games:
+        return
+        
+    game = games[game_id]
+    
+    if player_info['id'] != game.host_player_id:
+        emit('error', {'message': '只有房主可以恢復遊戲'})
+        return
+    
+    if game_actors.call(game_id, game.resume_game):
+        outbound.emit(game_id, 'game_resumed', {'remaining_time': game.get_remaining_time()})
 
 def get_policy_name(action_type):
     """獲取政策名稱"""
@@ -1522,7 +2476,7 @@ def handle_usa_trade_war(game, player, target_country):
     target_data['stock_index_trend'] -= 15
     
     # 對美國自身的影響（35%機率反噬）
-    if random.random() < 0.35:
+    if game.rng.policy.random() < 0.35:
         data['gdp_trend'] -= 1.0
         data['inflation_trend'] += 0.8
         data['confidence_trend'] -= 5
@@ -1674,6 +2628,14 @@ def handle_oil_control(game, player, direction):
 if __name__ == '__main__':
     import os
     port = int(os.environ.get('PORT', 5000))
+    configure_logging(sampled_loggers=SAMPLED_LOGGERS)
+    game_logger.info("伺服器啟動: port=%d, 經濟引擎=%s, 分片=%d/%d, 持久化=%s", port,
+                     'numpy' if economy_engine is not None else 'dict',
+                     shard_config.shard_index, shard_config.shard_count,
+                     'on' if game_persistence is not None else 'off')
+    
+    # 還原重啟前進行中的遊戲
+    restore_games()
     
     # 生產環境配置
     socketio.run(app, 
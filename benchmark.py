@@ -0,0 +1,218 @@
+# benchmark.py - 熱路徑效能基準（不需 Socket.IO，結果輸出 JSON 便於跨版本比較）
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from app import GameState, COUNTRY_CONFIGS, build_realtime_frame, build_quarter_payload
+import wire
+from economy_engine import EconomyEngine, np
+from logging_setup import LOGGER_PREFIX
+
+DEFAULT_GAME_COUNTS = [1, 10, 100, 1000, 5000]
+COUNTRY_CODES = list(COUNTRY_CONFIGS)
+
+
+def build_rooms(game_count, rng, engine=None, min_players=1, max_players=6):
+    """建立 N 場進行中的合成遊戲（每場 1–6 名玩家）"""
+    games = []
+    for index in range(game_count):
+        game = GameState(f'bench-{index}', 'p0', headless=True, seed=rng.randrange(2 ** 32))
+        game.engine = engine
+        countries = rng.sample(COUNTRY_CODES, rng.randint(min_players, max_players))
+        for player_index, country_code in enumerate(countries):
+            game.add_player(f'p{player_index}', COUNTRY_CONFIGS[country_code]['name'], country_code)
+        game.game_duration_quarters = 10 ** 6  # 基準測試期間不結束遊戲
+        game.start_game()
+        games.append(game)
+    return games
+
+
+def summarize_timings(samples, game_count):
+    """將每輪總耗時（秒）整理為毫秒統計"""
+    ordered = sorted(samples)
+    return {
+        'runs': len(samples),
+        'min_ms': round(ordered[0] * 1000, 4),
+        'median_ms': round(statistics.median(ordered) * 1000, 4),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 4),
+        'max_ms': round(ordered[-1] * 1000, 4),
+        'per_game_us': round(statistics.median(ordered) / game_count * 1e6, 3)
+    }
+
+
+def time_runs(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def payload_size(payload):
+    """與 Socket.IO 相同的緊湊 JSON 編碼後的位元組數"""
+    return len(wire.dumps(payload).encode('utf-8'))
+
+
+def binary_payload_size(game, payload):
+    """MessagePack 二進位格式的位元組數"""
+    return len(wire.pack_binary(payload, lambda player_id: game.players[player_id]['slot']))
+
+
+def size_stats(sizes):
+    return {
+        'mean_bytes': round(statistics.mean(sizes), 1),
+        'max_bytes': max(sizes),
+        'total_bytes': sum(sizes)
+    }
+
+
+def benchmark_rooms(game_count, seed=0, engine=None, tick_repeat=20, quarter_repeat=3):
+    """量測一組房間數下的各熱路徑耗時與封包大小"""
+    rng = random.Random(seed)
+    games = build_rooms(game_count, rng, engine)
+    player_count = sum(len(game.players) for game in games)
+
+    def tick():
+        # 與 run_due_timers 相同：逐場實時更新（引擎啟用時以陣列更新該場玩家）
+        for game in games:
+            game.tick_realtime()
+
+    def advance():
+        for game in games:
+            with game.state_lock():
+                game.advance_quarter()
+
+    def score():
+        for game in games:
+            game.calculate_final_scores()
+
+    def trigger_events():
+        for game in games:
+            with game.state_lock():
+                game.trigger_random_events()
+
+    # 第一幀為完整快照，先送出一次讓之後量到的是穩定狀態的差異幀
+    for game in games:
+        build_realtime_frame(game)
+    tick()
+    realtime_frames = [(game, build_realtime_frame(game)) for game in games]
+    realtime_sizes = [payload_size(frame) for _, frame in realtime_frames]
+
+    results = {
+        'games': game_count,
+        'players': player_count,
+        'tick': summarize_timings(time_runs(tick, tick_repeat), game_count),
+        'advance_quarter': summarize_timings(time_runs(advance, quarter_repeat), game_count),
+        'calculate_final_scores': summarize_timings(time_runs(score, quarter_repeat), game_count),
+        'trigger_random_events': summarize_timings(time_runs(trigger_events, quarter_repeat), game_count)
+    }
+
+    quarter_payloads = []
+    for game in games:
+        with game.state_lock():
+            triggered_events = game.advance_quarter()
+        quarter_payloads.append((game, build_quarter_payload(game, triggered_events)))
+
+    results['payload_bytes'] = {
+        'realtime_update': size_stats(realtime_sizes),
+        'quarter_advanced': size_stats([payload_size(payload) for _, payload in quarter_payloads])
+    }
+    if wire.binary_available():
+        results['payload_bytes']['realtime_update_msgpack'] = size_stats(
+            [binary_payload_size(game, frame) for game, frame in realtime_frames])
+        results['payload_bytes']['quarter_advanced_msgpack'] = size_stats(
+            [binary_payload_size(game, payload) for game, payload in quarter_payloads])
+    return results
+
+
+def git_commit():
+    """目前的 git commit（無法取得時為 None）"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextlib.contextmanager
+def quiet_game_logs():
+    """量測期間停用遊戲日誌（game.*），寫出日誌的時間不計入量測"""
+    game_logger = logging.getLogger(LOGGER_PREFIX)
+    previous_level = game_logger.level
+    game_logger.setLevel(logging.CRITICAL + 1)
+    try:
+        yield
+    finally:
+        game_logger.setLevel(previous_level)
+
+
+def run_benchmarks(game_counts=None, seed=0, use_engine=False, tick_repeat=20, quarter_repeat=3):
+    """依序量測每種房間數，回傳可寫入 JSON 的結果"""
+    game_counts = game_counts or DEFAULT_GAME_COUNTS
+    results = []
+    for game_count in game_counts:
+        engine = EconomyEngine() if use_engine else None
+        # 遊戲內部的日誌（例如缺少事件配置的警告）會影響量測，基準期間停用
+        with quiet_game_logs():
+            result = benchmark_rooms(game_count, seed, engine, tick_repeat, quarter_repeat)
+        print(f"games={game_count:>5} players={result['players']:>6} "
+              f"tick={result['tick']['median_ms']:.3f}ms "
+              f"advance_quarter={result['advance_quarter']['median_ms']:.1f}ms "
+              f"scores={result['calculate_final_scores']['median_ms']:.1f}ms",
+              file=sys.stderr)
+        results.append(result)
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'engine': 'numpy' if use_engine else 'dict',
+            'seed': seed,
+            'tick_repeat': tick_repeat,
+            'quarter_repeat': quarter_repeat
+        },
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='熱路徑效能基準')
+    parser.add_argument('--games', default=','.join(map(str, DEFAULT_GAME_COUNTS)),
+                        help='要量測的房間數（逗號分隔）')
+    parser.add_argument('--seed', type=int, default=0, help='合成房間的亂數種子')
+    parser.add_argument('--engine', choices=['dict', 'numpy'], default='dict', help='經濟指標更新方式')
+    parser.add_argument('--tick-repeat', type=int, default=20, help='實時更新量測次數')
+    parser.add_argument('--quarter-repeat', type=int, default=3, help='季度推進與評分量測次數')
+    parser.add_argument('--output', help='結果寫入的 JSON 檔（預設輸出到標準輸出）')
+    args = parser.parse_args()
+
+    if args.engine == 'numpy' and np is None:
+        parser.error('--engine numpy 需要安裝 NumPy')
+
+    report = run_benchmarks(
+        [int(count) for count in args.games.split(',')], args.seed,
+        args.engine == 'numpy', args.tick_repeat, args.quarter_repeat
+    )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+# country_state.py - 玩家國家狀態：固定欄位（__slots__）與固定容量的環形緩衝歷史
+from array import array
+from collections.abc import MutableMapping
+from operator import add
+
+from events_catalog import EFFECT_TARGETS
+from scoring import HISTORY_SERIES, HISTORY_WINDOW
+
+# 逐季圖表歷史的序列名稱與容量（遊戲最長 32 季，加上開局的第 1 筆）
+CHART_SERIES = ('quarters', 'gdp_growth', 'inflation', 'unemployment', 'confidence', 'stock_index')
+CHART_CAPACITY = 40
+
+# 純量欄位（順序即為序列化後的欄位順序，與原本的 country_data 字典相同）
+SCALAR_FIELDS = (
+    'gdp_growth', 'inflation', 'unemployment', 'confidence', 'stock_index',
+    'interest_rate', 'reserve_ratio', 'fiscal_deficit',
+    'skill_cooldown', 'policy_cooldowns',
+    'gov_spending_level', 'qe_level', 'emergency_used', 'emergency_confidence_used',
+    'cash_distribution_used', 'cash_distribution_cooldown',
+    'gdp_trend', 'inflation_trend', 'unemployment_trend', 'confidence_trend', 'stock_index_trend',
+    'fed_put_active', 'bubble_risk_level', 'panic_mode',
+    'taiwan_bet_target', 'taiwan_bet_quarters_left', 'brazil_anticorruption_used',
+    'saudi_transformation_level', 'saudi_oil_dependency', 'usa_trade_war_used',
+    'china_mass_mobilization_used', 'japan_aging_solution_used'
+)
+TRAILING_FIELDS = ('initial_fiscal_deficit', 'transformation_quarters')
+
+FIELD_ORDER = SCALAR_FIELDS + HISTORY_SERIES + TRAILING_FIELDS + ('history',)
+
+# 事件效果作用的數值欄位，以固定順序（EFFECT_TARGETS）存放在一個 array 中，事件效果為同樣排列的向量
+EFFECT_INDEX = {key: index for index, key in enumerate(EFFECT_TARGETS)}
+
+
+class RingBuffer:
+    """固定容量的數值序列（array 儲存），寫滿後覆蓋最舊的數值
+
+    支援 append、len、迭代、索引與切片（切片回傳 list），
+    可直接交給 scoring 當作歷史列表使用。
+    """
+
+    __slots__ = ('values', 'start', 'size')
+
+    def __init__(self, capacity, values=(), typecode='d'):
+        self.values = array(typecode, bytes(array(typecode).itemsize * capacity))
+        self.start = 0
+        self.size = 0
+        for value in values:
+            self.append(value)
+
+    def append(self, value):
+        capacity = len(self.values)
+        if self.size < capacity:
+            self.values[(self.start + self.size) % capacity] = value
+            self.size += 1
+        else:
+            self.values[self.start] = value
+            self.start = (self.start + 1) % capacity
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        capacity = len(self.values)
+        for offset in range(self.size):
+            yield self.values[(self.start + offset) % capacity]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.tolist()[index]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('RingBuffer index out of range')
+        return self.values[(self.start + index) % len(self.values)]
+
+    def tolist(self):
+        end = self.start + self.size
+        if end <= len(self.values):
+            return self.values[self.start:end].tolist()
+        return self.values[self.start:].tolist() + self.values[:end - len(self.values)].tolist()
+
+    def __repr__(self):
+        return f'RingBuffer({self.tolist()!r})'
+
+
+def new_chart_history():
+    return {name: RingBuffer(CHART_CAPACITY, typecode='l' if name == 'quarters' else 'd')
+            for name in CHART_SERIES}
+
+
+class CountryState(MutableMapping):
+    """玩家的國家狀態
+
+    以 __slots__ 儲存固定欄位，評分用的 *_history 與逐季圖表歷史 history 都是
+    環形緩衝，不再每季重新切片配置新列表。事件效果作用的欄位（EFFECT_TARGETS）
+    存放在固定排列的 effect_values，事件以 add_effects 一次加上整個效果向量。
+    保留字典介面（data['gdp_growth']、get、in、update），讀取歷史欄位會得到
+    RingBuffer 本身；items() 與 to_dict() 則輸出原本的字典格式（歷史為 list），
+    供 Socket.IO 傳輸、快照與差異比較使用。
+    """
+
+    __slots__ = tuple(key for key in FIELD_ORDER if key not in EFFECT_INDEX) + ('effect_values',)
+
+    def __init__(self):
+        self.effect_values = array('d', bytes(array('d').itemsize * len(EFFECT_TARGETS)))
+        for key in HISTORY_SERIES:
+            setattr(self, key, RingBuffer(HISTORY_WINDOW))
+        self.history = new_chart_history()
+
+    @classmethod
+    def from_dict(cls, data):
+        """由字典建立（初始化或由快照還原），未知欄位視為錯誤"""
+        state = cls()
+        for key, value in data.items():
+            state[key] = value
+        return state
+
+    def add_effects(self, vector):
+        """加上依 EFFECT_TARGETS 排列的事件效果向量"""
+        self.effect_values = array('d', map(add, self.effect_values, vector))
+
+    def __getitem__(self, key):
+        index = EFFECT_INDEX.get(key)
+        if index is not None:
+            return self.effect_values[index]
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        index = EFFECT_INDEX.get(key)
+        if index is not None:
+            self.effect_values[index] = value
+            return
+        if key in HISTORY_SERIES:
+            value = RingBuffer(HISTORY_WINDOW, value)
+        elif key == 'history':
+            history = new_chart_history()
+            for name, values in value.items():
+                for item in values:
+                    history[name].append(item)
+            value = history
+        try:
+            setattr(self, key, value)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __delitem__(self, key):
+        raise TypeError('CountryState 欄位固定，無法刪除')
+
+    def __iter__(self):
+        for key in FIELD_ORDER:
+            if key in EFFECT_INDEX or hasattr(self, key):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        return isinstance(key, str) and key in FIELD_ORDER and (key in EFFECT_INDEX or hasattr(self, key))
+
+    def wire_value(self, key):
+        """欄位的傳輸格式（歷史轉為 list）"""
+        value = self[key]
+        if key in HISTORY_SERIES:
+            return value.tolist()
+        if key == 'history':
+            return {name: series.tolist() for name, series in value.items()}
+        return value
+
+    def items(self):
+        return [(key, self.wire_value(key)) for key in self]
+
+    def values(self):
+        return [self.wire_value(key) for key in self]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f'CountryState({self.to_dict()!r})'
+
+
+def to_wire(value):
+    """json.dumps 的 default：CountryState 轉為原本的字典格式"""
+    if isinstance(value, CountryState):
+        return value.to_dict()
+    if isinstance(value, RingBuffer):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
@@ -0,0 +1,181 @@
+# economy_engine.py - 向量化經濟狀態引擎（選用，需要 NumPy）
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 未安裝時停用引擎
+    np = None
+
+# 經濟指標與對應趨勢欄位（陣列列順序）
+INDICATORS = ('gdp_growth', 'inflation', 'unemployment', 'confidence', 'stock_index')
+TRENDS = ('gdp_trend', 'inflation_trend', 'unemployment_trend', 'confidence_trend', 'stock_index_trend')
+
+# 指標範圍限制
+LOWER_BOUNDS = (-8, -3, 1, 0, 20)
+UPPER_BOUNDS = (12, 8, 25, 100, 200)
+
+logger = logging.getLogger('game.engine')
+
+REALTIME_UPDATE_RATE = 0.02  # 實時更新的趨勢漂移比例
+TREND_DECAY = 0.7  # 季度結束時的趨勢衰減
+
+
+class EconomyEngine:
+    """以 struct-of-arrays 保存所有遊戲玩家的經濟指標
+
+    每個指標與趨勢各佔一列連續記憶體，欄位為 (game, player) 槽位。
+    實時漂移、範圍限制與趨勢衰減以向量運算一次處理一場遊戲的所有玩家，
+    由該遊戲的 actor 呼叫（與 tick_count 同步，重播結果一致）；
+    country_data 字典只在送出資料前才寫回。
+
+    各遊戲的槽位只由自己的 actor 讀寫，self.lock 只保護槽位配置與陣列擴充，
+    每次只持有一個陣列運算的時間，不會讓不同遊戲互相等待整段修改。
+    """
+
+    def __init__(self, capacity=64):
+        self.lock = threading.RLock()
+        self.capacity = capacity
+        self.values = np.zeros((len(INDICATORS), capacity))
+        self.trends = np.zeros((len(TRENDS), capacity))
+        self.lower = np.array(LOWER_BOUNDS, dtype=float)[:, None]
+        self.upper = np.array(UPPER_BOUNDS, dtype=float)[:, None]
+        self.running = np.zeros(capacity, dtype=bool)
+        self.views = [None] * capacity  # 槽位: country_data 字典
+        self.slots = {}  # (game_id, player_id): 槽位
+        self.game_slots = {}  # game_id: [槽位...]
+        self.free_slots = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        """槽位不足時加倍容量"""
+        old_capacity = self.capacity
+        self.capacity *= 2
+        for name in ('values', 'trends'):
+            old = getattr(self, name)
+            new = np.zeros((old.shape[0], self.capacity))
+            new[:, :old_capacity] = old
+            setattr(self, name, new)
+        running = np.zeros(self.capacity, dtype=bool)
+        running[:old_capacity] = self.running
+        self.running = running
+        self.views.extend([None] * old_capacity)
+        self.free_slots.extend(range(self.capacity - 1, old_capacity - 1, -1))
+
+    def register(self, game_id, player_id, country_data, running=False):
+        """登記玩家並配置槽位（running 為遊戲目前是否進行中，例如開始後才加入的玩家）"""
+        with self.lock:
+            if not self.free_slots:
+                self._grow()
+            slot = self.free_slots.pop()
+            self.slots[(game_id, player_id)] = slot
+            self.game_slots.setdefault(game_id, []).append(slot)
+            self.views[slot] = country_data
+            self._load_slots([slot])
+            self.running[slot] = running
+            return slot
+
+    def release_game(self, game_id):
+        """釋放整場遊戲的槽位"""
+        with self.lock:
+            for slot in self.game_slots.pop(game_id, []):
+                self.values[:, slot] = 0
+                self.trends[:, slot] = 0
+                self.running[slot] = False
+                self.views[slot] = None
+                self.free_slots.append(slot)
+            self.slots = {key: slot for key, slot in self.slots.items() if key[0] != game_id}
+
+    def set_running(self, game_id, running):
+        """設定遊戲是否參與實時更新"""
+        with self.lock:
+            slots = self.game_slots.get(game_id, [])
+            self.running[slots] = running
+
+    def _load_slots(self, slots):
+        """從 country_data 字典讀入陣列"""
+        for slot in slots:
+            data = self.views[slot]
+            self.values[:, slot] = [data[key] for key in INDICATORS]
+            self.trends[:, slot] = [data.get(key, 0) for key in TRENDS]
+
+    def _store_slots(self, slots):
+        """將陣列寫回 country_data 字典"""
+        if not slots:
+            return
+        values = self.values[:, slots].T.tolist()
+        trends = self.trends[:, slots].T.tolist()
+        for slot, row, trend_row in zip(slots, values, trends):
+            data = self.views[slot]
+            for key, value in zip(INDICATORS, row):
+                data[key] = value
+            for key, value in zip(TRENDS, trend_row):
+                data[key] = value
+
+    def load(self, game_id):
+        """字典被修改後重新讀入陣列"""
+        with self.lock:
+            self._load_slots(self.game_slots.get(game_id, []))
+
+    def materialize(self, game_id):
+        """送出資料前將陣列寫回字典"""
+        with self.lock:
+            self._store_slots(self.game_slots.get(game_id, []))
+
+    @contextmanager
+    def editing(self, game_id):
+        """以字典修改遊戲狀態期間，字典為唯一真實來源（只在寫回與讀入時持有鎖）"""
+        self.materialize(game_id)
+        try:
+            yield
+        finally:
+            self.load(game_id)
+
+    def tick_game(self, game_id):
+        """一場遊戲進行中玩家的實時漂移與範圍限制"""
+        with self.lock:
+            slots = self.game_slots.get(game_id)
+            if not slots:
+                return
+            index = np.array(slots, dtype=np.intp)
+            index = index[self.running[index]]
+            if not len(index):
+                return
+            values = self.values[:, index]
+            values += self.trends[:, index] * REALTIME_UPDATE_RATE
+            np.clip(values, self.lower, self.upper, out=values)
+            self.values[:, index] = values
+
+    def step_quarter(self, game_id, noise):
+        """季度結束：加入隨機波動與趨勢、限制範圍、衰減趨勢
+
+        noise 為每位玩家依 INDICATORS 順序的波動值，須在 editing() 區塊內呼叫。
+        """
+        with self.lock:
+            slots = self.game_slots.get(game_id, [])
+            if not slots:
+                return
+            self._load_slots(slots)
+            values = self.values[:, slots]
+            values += np.array(noise, dtype=float).T
+            values += self.trends[:, slots]
+            np.clip(values, self.lower, self.upper, out=values)
+            self.values[:, slots] = values
+            self.trends[:, slots] *= TREND_DECAY
+            self._store_slots(slots)
+
+
+def create_engine():
+    """依環境變數 ECONOMY_ENGINE=numpy 建立引擎"""
+    if os.environ.get('ECONOMY_ENGINE', '').lower() != 'numpy':
+        return None
+    if np is None:
+        logger.warning("⚠️ ECONOMY_ENGINE=numpy 但未安裝 NumPy，使用字典逐一更新")
+        return None
+    logger.info("✅ 已啟用 NumPy 向量化經濟引擎")
+    return EconomyEngine()
+
+
+# 全域經濟引擎實例（未啟用時為 None）
+economy_engine = create_engine()
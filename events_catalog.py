@@ -0,0 +1,170 @@
+# events_catalog.py - 共用的隨機事件目錄（載入一次、依檔案修改時間熱更新）
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+EVENTS_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events_config.json')
+EVENT_CATEGORIES = ('good', 'bad')
+
+logger = logging.getLogger('game.catalog')
+
+# 國家代碼與事件配置中使用的中文名稱
+COUNTRY_NAMES_CHINESE = MappingProxyType({
+    'USA': '美國',
+    'CHN': '中國',
+    'JPN': '日本',
+    'TWN': '台灣',
+    'SAU': '沙烏地阿拉伯',
+    'BRA': '巴西'
+})
+COUNTRY_CODES_BY_NAME = MappingProxyType({name: code for code, name in COUNTRY_NAMES_CHINESE.items()})
+
+# 事件效果向量的固定欄位順序（事件配置中的鍵名）
+EFFECT_FIELDS = ('gdp', 'inflation', 'unemployment', 'confidence', 'deficit', 'stock_index', 'global_oil_price')
+# 各欄位對應的 country_data 鍵（最後一欄油價為全球狀態，另行處理）
+EFFECT_TARGETS = ('gdp_trend', 'inflation_trend', 'unemployment_trend', 'confidence', 'fiscal_deficit', 'stock_index_trend')
+OIL_FIELD = 'global_oil_price'
+EFFECT_KEYS = ('effects', 'globalEffects')  # 事件中的效果字典（本國效果、對其他國家的效果）
+
+
+def compile_effects(effects):
+    """將效果字典編譯為 (效果向量, 油價變動)
+
+    效果向量依 EFFECT_TARGETS 排列（未列出的欄位為 0，全為 0 時為 None），
+    由 CountryState.add_effects 一次加到玩家狀態。
+    """
+    if not effects:
+        return None
+    vector = tuple(effects.get(field, 0) for field in EFFECT_FIELDS[:len(EFFECT_TARGETS)])
+    return (vector if any(vector) else None), effects.get(OIL_FIELD, 0)
+
+# 預設事件配置（當 JSON 檔案載入失敗時使用）
+DEFAULT_EVENTS = {
+    "globalEvents": {
+        "good": [
+            {
+                "name": "全球經濟復甦",
+                "description": "國際經濟展現強勁復甦動能",
+                "effects": {"gdp": 1.0, "confidence": 10}
+            }
+        ],
+        "bad": [
+            {
+                "name": "國際貿易衝突",
+                "description": "主要經濟體貿易摩擦加劇",
+                "effects": {"gdp": -1.0, "confidence": -10}
+            }
+        ]
+    },
+    "countryEvents": {}
+}
+
+
+class EventCatalog:
+    """預先整理好的唯讀事件目錄，由所有遊戲共用
+
+    global_events: {'good': (事件...), 'bad': (事件...)}
+    country_events: {國家代碼: {'name', 'good_news_ratio', 'good', 'bad'}}
+    每個事件在載入時取得穩定的 event_id（範圍:類別:序號），effects 與 globalEffects
+    依 event_id 預先編譯為效果向量。事件字典會直接放進送出的事件資料中，請勿修改。
+    """
+
+    __slots__ = ('global_events', 'country_events', 'compiled_effects')
+
+    def __init__(self, config):
+        self.compiled_effects = {}  # (event_id, 效果鍵): (效果向量, 油價變動)
+        global_config = config.get('globalEvents', {})
+        self.global_events = MappingProxyType({
+            category: tuple(global_config.get(category, ())) for category in EVENT_CATEGORIES
+        })
+
+        country_events = {}
+        for country_name, country_config in config.get('countryEvents', {}).items():
+            events = country_config.get('events', {})
+            country_events[COUNTRY_CODES_BY_NAME.get(country_name, country_name)] = MappingProxyType({
+                'name': country_name,
+                'good_news_ratio': country_config.get('goodNewsRatio', 0.5),
+                'good': tuple(events.get('good', ())),
+                'bad': tuple(events.get('bad', ()))
+            })
+        self.country_events = MappingProxyType(country_events)
+
+        scopes = [('global', self.global_events)] + list(self.country_events.items())
+        for scope, pools in scopes:
+            for category in EVENT_CATEGORIES:
+                for index, event in enumerate(pools[category]):
+                    event['event_id'] = f'{scope}:{category}:{index}'
+                    for key in EFFECT_KEYS:
+                        if event.get(key):
+                            self.compiled_effects[(event['event_id'], key)] = compile_effects(event[key])
+
+    def event_effects(self, event, key='effects'):
+        """依 event_id 取得事件效果的預先編譯結果（沒有 event_id 的事件即時編譯）"""
+        compiled = self.compiled_effects.get((event.get('event_id'), key))
+        if compiled is None:
+            compiled = compile_effects(event.get(key))
+        return compiled
+
+
+class EventCatalogSource:
+    """監看事件配置檔的修改時間，變更時重新載入並整份替換目錄
+
+    已建立的遊戲保留建立時取得的目錄，新遊戲使用最新版本。
+    """
+
+    def __init__(self, path=EVENTS_CONFIG_PATH, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.catalog = None
+        self.mtime = None  # 上次讀取時的檔案修改時間
+        self.next_check = 0.0
+
+    def current(self):
+        """取得目前的事件目錄（最多每 check_interval 秒檢查一次檔案）"""
+        now = time.monotonic()
+        if now >= self.next_check:
+            with self.lock:
+                if now >= self.next_check:
+                    self.next_check = now + self.check_interval
+                    self._reload_if_changed()
+        return self.catalog
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self.catalog is not None and mtime == self.mtime:
+            return
+        self.mtime = mtime  # 載入失敗時也記錄，檔案再次變更前不重試
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            if self.catalog is None:
+                logger.warning("⚠️ events_config.json 檔案未找到，使用預設事件")
+                self.catalog = EventCatalog(DEFAULT_EVENTS)
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            # 重新載入失敗時保留舊目錄
+            if self.catalog is None:
+                logger.warning("⚠️ events_config.json 格式錯誤: %s，使用預設事件", e)
+                self.catalog = EventCatalog(DEFAULT_EVENTS)
+            else:
+                logger.warning("⚠️ events_config.json 重新載入失敗: %s，沿用目前的事件配置", e)
+            return
+
+        reloaded = self.catalog is not None
+        # 單一參考賦值，其他執行緒不會看到載入到一半的目錄
+        self.catalog = EventCatalog(config)
+        logger.info("✅ 事件配置%s載入成功，包含 %d 個全球好事件",
+                    '重新' if reloaded else '', len(self.catalog.global_events['good']))
+
+
+# 全域事件目錄來源
+event_catalog_source = EventCatalogSource()
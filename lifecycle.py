@@ -0,0 +1,148 @@
+# lifecycle.py - 遊戲生命週期：房間代碼配置、閒置與已結束遊戲的回收
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('game.lifecycle')
+
+ROOM_ID_RANGE = range(1000, 10000)  # 四位數房間代碼
+
+
+class RoomIdAllocator:
+    """以打亂順序的空閒代碼佇列配置房間代碼，配置與釋放皆為 O(1)
+
+    只包含本分片負責的代碼（owns 為 shard_config.owns），不會與使用中的房間衝突。
+    釋放的代碼排到佇列尾端，盡量延後重複使用。
+    """
+
+    def __init__(self, owns=None, id_range=ROOM_ID_RANGE):
+        ids = [str(number) for number in id_range if owns is None or owns(str(number))]
+        random.SystemRandom().shuffle(ids)
+        self.free = deque(ids)
+        self.in_use = set()
+        self.lock = threading.Lock()
+
+    def allocate(self):
+        """取得一個未使用的代碼，全部用完時回傳 None"""
+        with self.lock:
+            while self.free:
+                game_id = self.free.popleft()
+                if game_id not in self.in_use:  # 還原時保留的代碼留在佇列中，取到時略過
+                    self.in_use.add(game_id)
+                    return game_id
+            return None
+
+    def reserve(self, game_id):
+        """標記已存在的房間代碼（例如重啟後還原的遊戲）"""
+        with self.lock:
+            self.in_use.add(game_id)
+
+    def release(self, game_id):
+        """房間移除後歸還代碼"""
+        with self.lock:
+            if game_id in self.in_use:
+                self.in_use.discard(game_id)
+                self.free.append(game_id)
+
+    def available(self):
+        with self.lock:
+            return len(self.free)
+
+
+class GameLifecycleManager:
+    """定期回收遊戲：已結束超過保留時間、或所有玩家離線且閒置過久的房間
+
+    on_evict(game, reason) 在遊戲的 actor 上關閉遊戲（釋放排程、引擎槽位與持久化檔案），
+    完成後呼叫 complete_eviction：封存已結束的遊戲到 archive_dir、移除遊戲並歸還房間代碼。
+    未設定 on_evict 時直接完成回收。
+    """
+
+    def __init__(self, games, allocator, idle_timeout=300.0, retention=600.0,
+                 archive_dir=None, sweep_interval=30.0, on_evict=None):
+        self.games = games
+        self.allocator = allocator
+        self.idle_timeout = idle_timeout
+        self.retention = retention
+        self.archive_dir = archive_dir
+        self.sweep_interval = sweep_interval
+        self.on_evict = on_evict
+        self.evicting = set()  # 已開始回收、尚未完成的 game_id
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def eviction_reason(self, game, now):
+        """回傳應回收的原因，不需回收時為 None"""
+        if game.final_scores is not None:
+            ended_at = game.ended_at or game.last_activity
+            if now - ended_at >= self.retention:
+                return 'finished'
+            return None
+        if any(player['connected'] for player in list(game.players.values())):
+            return None
+        if now - game.last_activity >= self.idle_timeout:
+            return 'idle_lobby' if not game.game_started else 'abandoned'
+        return None
+
+    def sweep(self, now=None):
+        """檢查所有遊戲並回收符合條件者，回傳回收的 game_id 列表"""
+        if now is None:
+            now = time.time()
+        evicted = []
+        for game_id, game in list(self.games.items()):
+            reason = self.eviction_reason(game, now)
+            if reason is None:
+                continue
+            if self.evict(game_id, reason):
+                evicted.append(game_id)
+        return evicted
+
+    def evict(self, game_id, reason):
+        """開始回收遊戲（已在回收中則略過），回傳是否開始回收"""
+        game = self.games.get(game_id)
+        with self.lock:
+            if game is None or game_id in self.evicting:
+                return False
+            self.evicting.add(game_id)
+        if self.on_evict is not None:
+            self.on_evict(game, reason)
+        else:
+            self.complete_eviction(game, reason)
+        return True
+
+    def complete_eviction(self, game, reason):
+        """遊戲關閉後封存、移除遊戲並歸還房間代碼（代碼之後才可能配置給新遊戲）"""
+        if reason == 'finished' and self.archive_dir:
+            self.archive(game)
+        self.games.pop(game.game_id, None)
+        with self.lock:
+            self.evicting.discard(game.game_id)
+        self.allocator.release(game.game_id)
+        logger.info("回收遊戲（%s）", reason, extra={'game_id': game.game_id})
+
+    def archive(self, game):
+        """將已結束遊戲的完整狀態寫入封存目錄"""
+        try:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            path = os.path.join(self.archive_dir, f'game_{game.game_id}_{int(game.ended_at or time.time())}.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(game.to_snapshot(), f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning("⚠️ 遊戲封存失敗: %s", e, extra={'game_id': game.game_id})
+
+    def start(self):
+        """啟動背景回收執行緒"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("遊戲回收執行錯誤")
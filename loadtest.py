@@ -0,0 +1,397 @@
+# loadtest.py - 端對端壓力測試：以大量 python-socketio 客戶端模擬玩家
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import socketio
+
+try:
+    import psutil
+except ImportError:  # 未安裝時改讀 /proc（僅 Linux）
+    psutil = None
+
+COUNTRY_CODES = ['USA', 'CHN', 'JPN', 'TWN', 'BRA', 'SAU']
+REALTIME_FRAME_INTERVAL = 0.5  # 與伺服器實時更新間隔相同
+
+
+def percentiles(samples):
+    """p50/p95/p99（毫秒，取最近排名）"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000, 2)
+
+    return {
+        'count': len(ordered),
+        'p50_ms': rank(50),
+        'p95_ms': rank(95),
+        'p99_ms': rank(99),
+        'max_ms': round(ordered[-1] * 1000, 2)
+    }
+
+
+def random_action(rng):
+    """隨機產生一個一般政策行動（不含需要目標的主動技能）"""
+    action_type = rng.choice(['interest_rate', 'reserve_ratio', 'fiscal_policy', 'quantitative_easing'])
+    action = {'action_type': action_type}
+    if action_type == 'interest_rate':
+        action['value'] = round(rng.uniform(0.5, 6.0), 2)
+    elif action_type == 'reserve_ratio':
+        action['value'] = round(rng.uniform(5.0, 15.0), 1)
+    elif action_type == 'fiscal_policy':
+        action['policy_type'] = rng.choice(['increase_spending', 'decrease_spending'])
+    else:
+        action['direction'] = rng.choice(['easing', 'tightening'])
+    return action
+
+
+class LoadClient:
+    """一位模擬玩家：建立或加入房間、定期發動政策與查詢排名，並記錄延遲"""
+
+    def __init__(self, index, url, country_code, stats):
+        self.index = index
+        self.url = url
+        self.name = f'load-{index}'
+        self.country_code = country_code
+        self.stats = stats
+        self.rng = random.Random(index)
+        self.sio = socketio.Client(reconnection=False)
+        self.game_id = None
+        self.joined = threading.Event()
+        self.started = threading.Event()
+        self.lock = threading.Lock()
+        self.pending_action = None  # 發送政策行動的時間
+        self.pending_standings = None  # 發送排名查詢的時間
+        self.last_log_seq = 0
+        self.last_frame_at = None
+
+        self.sio.on('game_created', self.on_game_created)
+        self.sio.on('player_joined', self.on_player_joined)
+        self.sio.on('game_started', self.on_game_started)
+        self.sio.on('game_update', self.on_game_update)
+        self.sio.on('standings_update', self.on_standings_update)
+        self.sio.on('realtime_update', self.on_realtime_update)
+        self.sio.on('error', self.on_error)
+
+    def connect(self):
+        self.sio.connect(self.url, wait_timeout=10)
+
+    def create_game(self):
+        self.sio.emit('create_game', {'player_name': self.name, 'country_code': self.country_code})
+
+    def join_game(self, game_id):
+        self.game_id = game_id
+        self.sio.emit('join_game', {'game_id': game_id, 'player_name': self.name, 'country_code': self.country_code})
+
+    def disconnect(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+    # ===== 伺服器事件 =====
+
+    def on_game_created(self, data):
+        self.game_id = data['game_id']
+        self.joined.set()
+
+    def on_player_joined(self, data):
+        if data.get('player_data', {}).get('name') == self.name:
+            self.joined.set()
+
+    def on_game_started(self, data):
+        self.started.set()
+
+    def on_game_update(self, data):
+        # 房間內任何玩家的行動都會廣播，只計算包含自己新日誌的更新
+        now = time.perf_counter()
+        own_seq = max((entry.get('seq', 0) for entry in data.get('game_log', [])
+                       if entry.get('message', '').startswith(self.name + ':')), default=0)
+        with self.lock:
+            if self.pending_action is not None and own_seq > self.last_log_seq:
+                self.stats.record('action_latency', now - self.pending_action)
+                self.pending_action = None
+            self.last_log_seq = max(self.last_log_seq, own_seq)
+
+    def on_error(self, data):
+        now = time.perf_counter()
+        with self.lock:
+            if self.pending_action is not None:
+                # 冷卻中等被拒絕的行動也是一次完整往返
+                self.stats.record('action_error_latency', now - self.pending_action)
+                self.pending_action = None
+        self.stats.count('errors')
+
+    def on_standings_update(self, data):
+        now = time.perf_counter()
+        with self.lock:
+            if self.pending_standings is not None:
+                self.stats.record('standings_latency', now - self.pending_standings)
+                self.pending_standings = None
+
+    def on_realtime_update(self, data):
+        now = time.time()
+        self.stats.count('realtime_frames')
+        # 伺服器的幀對齊全域 0.5 秒網格，同一台機器上可直接算出延遲
+        self.stats.record('realtime_lateness', now % REALTIME_FRAME_INTERVAL)
+        if self.last_frame_at is not None:
+            self.stats.record('realtime_jitter', abs(now - self.last_frame_at - REALTIME_FRAME_INTERVAL))
+        self.last_frame_at = now
+
+    # ===== 模擬玩家行為 =====
+
+    def run(self, stop_at, action_interval, standings_interval):
+        """依指數分布的間隔發動政策與查詢排名，直到 stop_at"""
+        next_action = time.time() + self.rng.expovariate(1 / action_interval)
+        next_standings = time.time() + self.rng.uniform(0, standings_interval)
+        while time.time() < stop_at and self.sio.connected:
+            now = time.time()
+            if now >= next_action:
+                with self.lock:
+                    self.pending_action = time.perf_counter()
+                self.sio.emit('policy_action', random_action(self.rng))
+                self.stats.count('actions_sent')
+                next_action = now + self.rng.expovariate(1 / action_interval)
+            if now >= next_standings:
+                with self.lock:
+                    self.pending_standings = time.perf_counter()
+                self.sio.emit('request_standings')
+                self.stats.count('standings_sent')
+                next_standings = now + standings_interval
+            time.sleep(max(0.01, min(next_action, next_standings, stop_at) - time.time()))
+
+
+class LoadStats:
+    """執行緒安全的延遲樣本與計數"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counters = {}
+
+    def record(self, name, value):
+        with self.lock:
+            self.samples.setdefault(name, []).append(value)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.counters = {}
+
+
+class ProcessMonitor:
+    """每秒取樣伺服器行程的 CPU 與記憶體"""
+
+    def __init__(self, pid, interval=1.0):
+        self.pid = pid
+        self.interval = interval
+        self.cpu_percent = []
+        self.rss_bytes = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _read_proc(self):
+        """由 /proc 讀取累計 CPU 秒數與 RSS"""
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        rss = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+        return cpu_seconds, rss
+
+    def _run(self):
+        if psutil is not None:
+            process = psutil.Process(self.pid)
+            process.cpu_percent()
+            while not self.stopped.wait(self.interval):
+                self.cpu_percent.append(process.cpu_percent())
+                self.rss_bytes.append(process.memory_info().rss)
+            return
+
+        try:
+            last_cpu, _ = self._read_proc()
+        except OSError:
+            print("⚠️ 無法讀取伺服器行程資訊（需要 psutil 或 /proc）", file=sys.stderr)
+            return
+        last_time = time.monotonic()
+        while not self.stopped.wait(self.interval):
+            cpu, rss = self._read_proc()
+            now = time.monotonic()
+            self.cpu_percent.append((cpu - last_cpu) / (now - last_time) * 100)
+            self.rss_bytes.append(rss)
+            last_cpu, last_time = cpu, now
+
+    def summary(self):
+        if not self.cpu_percent:
+            return None
+        return {
+            'cpu_percent_mean': round(sum(self.cpu_percent) / len(self.cpu_percent), 1),
+            'cpu_percent_max': round(max(self.cpu_percent), 1),
+            'rss_mb_max': round(max(self.rss_bytes) / 2 ** 20, 1),
+            'rss_mb_last': round(self.rss_bytes[-1] / 2 ** 20, 1)
+        }
+
+
+def start_server(port):
+    """在本機啟動遊戲伺服器並等待可連線"""
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    env = dict(os.environ, PORT=str(port))
+    process = subprocess.Popen([sys.executable, app_path], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'伺服器啟動失敗，代碼 {process.returncode}')
+        try:
+            urllib.request.urlopen(url + '/shard', timeout=1)
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('等待伺服器啟動逾時')
+
+
+def setup_rooms(url, client_count, players_per_room, stats, ramp=0.0):
+    """建立房間並讓所有客戶端加入，回傳已就位的客戶端"""
+    clients = []
+    delay = ramp / max(1, client_count)
+    for room_start in range(0, client_count, players_per_room):
+        room = []
+        for offset in range(min(players_per_room, client_count - room_start)):
+            client = LoadClient(room_start + offset, url, COUNTRY_CODES[offset], stats)
+            try:
+                client.connect()
+            except Exception as e:
+                stats.count('connect_failures')
+                print(f"⚠️ 客戶端 {client.name} 連線失敗: {e}", file=sys.stderr)
+                continue
+            room.append(client)
+            time.sleep(delay)
+        if not room:
+            continue
+
+        host = room[0]
+        host.create_game()
+        if not host.joined.wait(10):
+            stats.count('join_failures', len(room))
+            continue
+        for client in room[1:]:
+            client.join_game(host.game_id)
+            if not client.joined.wait(10):
+                stats.count('join_failures')
+        host.sio.emit('start_game')
+        clients.extend(room)
+
+    for client in clients:
+        if not client.started.wait(10):
+            stats.count('start_failures')
+    return clients
+
+
+def run_load_test(clients=100, players_per_room=4, duration=60.0, action_interval=12.0,
+                  standings_interval=15.0, url=None, port=5050, ramp=0.0):
+    """執行一次壓力測試並回傳統計結果"""
+    stats = LoadStats()
+    server = None
+    if url is None:
+        server, url = start_server(port)
+
+    monitor = ProcessMonitor(server.pid) if server is not None else None
+    try:
+        setup_started = time.time()
+        load_clients = setup_rooms(url, clients, players_per_room, stats, ramp)
+        setup_seconds = time.time() - setup_started
+
+        # 暖機期間的樣本不計入
+        stats.reset()
+        if monitor is not None:
+            monitor.start()
+
+        stop_at = time.time() + duration
+        threads = [
+            threading.Thread(target=client.run, args=(stop_at, action_interval, standings_interval), daemon=True)
+            for client in load_clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if monitor is not None:
+            monitor.stop()
+        for client in load_clients:
+            client.disconnect()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    samples = stats.samples
+    return {
+        'config': {
+            'clients': clients,
+            'connected_clients': len(load_clients),
+            'rooms': math.ceil(clients / players_per_room),
+            'players_per_room': players_per_room,
+            'duration_s': duration,
+            'action_interval_s': action_interval,
+            'standings_interval_s': standings_interval,
+            'setup_s': round(setup_seconds, 2),
+            'url': url
+        },
+        'action_to_game_update': percentiles(samples.get('action_latency', [])),
+        'action_to_error': percentiles(samples.get('action_error_latency', [])),
+        'standings': percentiles(samples.get('standings_latency', [])),
+        'realtime_jitter': percentiles(samples.get('realtime_jitter', [])),
+        'realtime_lateness': percentiles(samples.get('realtime_lateness', [])) if server is not None else None,
+        'counters': stats.counters,
+        'server': monitor.summary() if monitor is not None else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以模擬 Socket.IO 客戶端對遊戲伺服器施加負載')
+    parser.add_argument('--clients', type=int, default=100, help='模擬玩家數')
+    parser.add_argument('--players-per-room', type=int, default=4, choices=range(1, len(COUNTRY_CODES) + 1),
+                        help='每個房間的玩家數')
+    parser.add_argument('--duration', type=float, default=60.0, help='量測秒數（不含建立房間）')
+    parser.add_argument('--action-interval', type=float, default=12.0, help='每位玩家平均幾秒發動一次政策')
+    parser.add_argument('--standings-interval', type=float, default=15.0, help='每位玩家幾秒查詢一次排名')
+    parser.add_argument('--url', help='連線到已啟動的伺服器（未指定時在本機啟動）')
+    parser.add_argument('--port', type=int, default=5050, help='本機啟動伺服器使用的埠號')
+    parser.add_argument('--ramp', type=float, default=0.0, help='在幾秒內逐步建立所有連線')
+    parser.add_argument('--output', help='結果寫入的 JSON 檔')
+    args = parser.parse_args()
+
+    report = run_load_test(
+        args.clients, args.players_per_room, args.duration, args.action_interval,
+        args.standings_interval, args.url, args.port, args.ramp
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# logging_setup.py - 結構化日誌：分級、子系統 logger、抽樣限流與佇列輸出
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+# 子系統 logger 名稱（game.timer、game.events、game.policy ...）
+LOGGER_PREFIX = 'game'
+
+# LogRecord 的標準屬性，其餘視為 extra 欄位輸出
+STANDARD_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+def get_logger(subsystem):
+    """取得子系統 logger，例如 get_logger('timer') -> game.timer"""
+    return logging.getLogger(f'{LOGGER_PREFIX}.{subsystem}')
+
+
+class RateLimitFilter(logging.Filter):
+    """依訊息範本限流：每個範本每 interval 秒最多放行 burst 筆
+
+    被略過的筆數會附在下一筆放行的紀錄上（suppressed 欄位）。
+    """
+
+    def __init__(self, burst=5, interval=10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.windows = {}  # (logger, 訊息範本): [視窗開始時間, 已放行筆數, 略過筆數]
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每筆紀錄輸出一行 JSON（含 extra 欄位，例如 game_id）"""
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """人類可讀格式，extra 欄位附在訊息後"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        extras = [f'{key}={value}' for key, value in vars(record).items()
+                  if key not in STANDARD_RECORD_ATTRS and not key.startswith('_')]
+        return f'{text} [{" ".join(extras)}]' if extras else text
+
+
+_listener = None
+
+
+def configure_logging(level=None, log_format=None, sampled_loggers=()):
+    """設定根 logger：紀錄先放入佇列，由背景執行緒寫到標準輸出
+
+    level 與 log_format 未指定時讀取環境變數 LOG_LEVEL（預設 INFO）
+    與 LOG_FORMAT（text 或 json）。sampled_loggers 中的子系統套用限流。
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = level or os.environ.get('LOG_LEVEL', 'INFO').upper()
+    log_format = log_format or os.environ.get('LOG_FORMAT', 'text').lower()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if log_format == 'json' else TextFormatter())
+
+    # 計時器等執行緒只把紀錄放進佇列，不會因標準輸出阻塞
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    # 每個 HTTP 請求（含 Socket.IO 長輪詢）一筆的存取日誌預設關閉
+    logging.getLogger('werkzeug').setLevel(os.environ.get('WERKZEUG_LOG_LEVEL', 'WARNING').upper())
+
+    for subsystem in sampled_loggers:
+        get_logger(subsystem).addFilter(RateLimitFilter(
+            burst=int(os.environ.get('LOG_SAMPLE_BURST', 5)),
+            interval=float(os.environ.get('LOG_SAMPLE_INTERVAL', 10.0))
+        ))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
@@ -0,0 +1,168 @@
+# metrics.py - Prometheus 文字格式的伺服器指標（計數器、量測值、直方圖）
+import bisect
+import json
+import threading
+
+import wire
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """只增不減的計數器（可依標籤分組）"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {} if self.labelnames else {(): 0}  # 標籤值 tuple: 累計值
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, *labelvalues):
+        with self.lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        return [(self.name, format_labels(self.labelnames, labels), value) for labels, value in items]
+
+
+class Gauge:
+    """抓取時才計算的量測值（callback 回傳數值或 {標籤值 tuple: 數值}）"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name, format_labels(self.labelnames, labels), value) for labels, value in values.items()]
+
+
+class Histogram:
+    """固定區間的直方圖（記錄秒數）"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self):
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket', format_labels((), (), [('le', format_value(bound))]), cumulative))
+        samples.append((f'{self.name}_sum', '', total))
+        samples.append((f'{self.name}_count', '', cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """收集所有指標並輸出 Prometheus 文字格式"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, callback, labelnames=()):
+        return self.register(Gauge(name, documentation, callback, labelnames))
+
+    def histogram(self, name, documentation, buckets):
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# 全域指標
+registry = MetricsRegistry()
+
+TIMER_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUARTER_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+timer_iteration_seconds = registry.histogram(
+    'game_timer_iteration_seconds', '計時器每輪處理到期遊戲的耗時', TIMER_BUCKETS)
+advance_quarter_seconds = registry.histogram(
+    'advance_quarter_duration_seconds', '單場遊戲季度推進（含送出）的耗時', QUARTER_BUCKETS)
+emitted_messages = registry.counter(
+    'socketio_emitted_messages_total', '送出的 Socket.IO 訊息數（每位接收者各計一次）', ['event'])
+emitted_bytes = registry.counter(
+    'socketio_emitted_bytes_total', '送出的 Socket.IO 訊息位元組數（每位接收者各計一次）', ['event'])
+events_triggered = registry.counter(
+    'game_events_triggered_total', '觸發的隨機事件數', ['type'])
+bubble_bursts = registry.counter(
+    'game_bubble_bursts_total', '股市泡沫破裂次數')
+games_evicted = registry.counter(
+    'games_evicted_total', '被回收的遊戲數', ['reason'])
+outbound_dropped = registry.counter(
+    'outbound_dropped_messages_total', '送出佇列中被取代（merged）或因佇列已滿捨棄（dropped）的訊息數', ['event', 'reason'])
+
+
+class CountingJSON:
+    """傳給 SocketIO(json=...) 的 JSON 模組，編碼事件封包時順便累計訊息數與位元組數
+
+    Socket.IO 對每位接收者編碼一次，計數即為實際送出的量，不需另外序列化。
+    編碼交給 wire.dumps：預先編碼的 Fragment 直接嵌入，CountryState 轉為字典格式。
+    """
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        encoded = wire.dumps(obj, *args, **kwargs)
+        if isinstance(obj, list) and obj and isinstance(obj[0], str):
+            emitted_messages.inc(1, obj[0])
+            emitted_bytes.inc(len(encoded), obj[0])
+        return encoded
+
+    @staticmethod
+    def loads(*args, **kwargs):
+        return json.loads(*args, **kwargs)
@@ -0,0 +1,140 @@
+# outbound.py - 每個房間獨立的送出佇列：遊戲執行緒只排入訊息，由送出執行緒池實際呼叫 emit
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('game.outbound')
+
+# 佇列已滿時可捨棄的事件：只有實時差異幀（客戶端發現序號不連續會要求完整快照），
+# 其餘事件（game_update、quarter_advanced、game_ended 等）沒有序號可補，一律送達
+DROPPABLE_EVENTS = ('realtime_update',)
+OUTBOX_BATCH_SIZE = 16  # 每次最多連續送出的訊息數，之後讓出送出執行緒給其他房間
+
+
+def is_realtime_delta(event, payload):
+    return event == 'realtime_update' and not payload.get('full')
+
+
+def merge_realtime_frames(older, newer):
+    """合併兩個相鄰的差異幀：base_seq 取較舊幀、seq 與其餘欄位取較新幀，玩家差異依序疊加"""
+    patches = {}
+    for patch in older['player_patches'] + newer['player_patches']:
+        merged = patches.get(patch['id'])
+        if merged is None:
+            patches[patch['id']] = patch
+            continue
+        merged = dict(merged)
+        if 'country_data' in patch and 'country_data' in merged:
+            country_data = dict(merged['country_data'])
+            country_data.update(patch['country_data'])
+            merged.update(patch)
+            merged['country_data'] = country_data
+        else:
+            merged.update(patch)
+        patches[patch['id']] = merged
+
+    frame = dict(older)
+    frame.update(newer)
+    frame['base_seq'] = older['base_seq']
+    frame['player_patches'] = list(patches.values())
+    return frame
+
+
+class RoomOutbox:
+    """單一房間的有界送出佇列，同一時間最多一個送出執行緒處理，維持送出順序"""
+
+    def __init__(self, room, capacity):
+        self.room = room
+        self.capacity = capacity
+        self.queue = deque()  # (event, payload, to)；event 為 None 代表關閉房間
+        self.lock = threading.Lock()
+        self.scheduled = False
+
+
+class OutboundDispatcher:
+    """管理所有房間的送出佇列與送出執行緒池
+
+    send(event, payload, room=..., to=...) 實際送出訊息，close(room) 關閉房間。
+    佇列尾端尚未送出的實時差異幀會被新的差異幀取代（合併），佇列已滿時捨棄
+    可捨棄的事件；客戶端發現實時序號不連續時會要求完整快照。
+    """
+
+    def __init__(self, send, close=None, workers=4, capacity=16, on_drop=None):
+        self.send = send
+        self.close = close
+        self.capacity = capacity
+        self.on_drop = on_drop  # on_drop(event, reason)，reason 為 merged 或 dropped
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='outbound')
+        self.outboxes = {}  # room: RoomOutbox
+        self.lock = threading.Lock()
+
+    def outbox(self, room):
+        with self.lock:
+            outbox = self.outboxes.get(room)
+            if outbox is None:
+                outbox = self.outboxes[room] = RoomOutbox(room, self.capacity)
+            return outbox
+
+    def emit(self, room, event, payload, to=None):
+        """排入房間的送出佇列（to 指定時只送給該連線，仍依房間順序送出）"""
+        outbox = self.outbox(room)
+        with outbox.lock:
+            queue = outbox.queue
+            if queue and is_realtime_delta(event, payload):
+                last_event, last_payload, last_to = queue[-1]
+                if last_to == to and is_realtime_delta(last_event, last_payload):
+                    queue[-1] = (event, merge_realtime_frames(last_payload, payload), to)
+                    self._dropped(event, 'merged')
+                    return
+            if len(queue) >= outbox.capacity and event in DROPPABLE_EVENTS and not payload.get('full'):
+                self._dropped(event, 'dropped')
+                return
+            queue.append((event, payload, to))
+            if outbox.scheduled:
+                return
+            outbox.scheduled = True
+        self.executor.submit(self._drain, outbox)
+
+    def close_room(self, room):
+        """排在已排入的訊息之後關閉房間，並移除送出佇列"""
+        outbox = self.outbox(room)
+        with outbox.lock:
+            outbox.queue.append((None, None, None))
+            with self.lock:
+                self.outboxes.pop(room, None)
+            if outbox.scheduled:
+                return
+            outbox.scheduled = True
+        self.executor.submit(self._drain, outbox)
+
+    def pending(self):
+        """所有房間尚未送出的訊息數"""
+        with self.lock:
+            outboxes = list(self.outboxes.values())
+        return sum(len(outbox.queue) for outbox in outboxes)
+
+    def _dropped(self, event, reason):
+        if self.on_drop is not None:
+            self.on_drop(event, reason)
+
+    def _drain(self, outbox):
+        for _ in range(OUTBOX_BATCH_SIZE):
+            with outbox.lock:
+                if not outbox.queue:
+                    outbox.scheduled = False
+                    return
+                event, payload, to = outbox.queue.popleft()
+            try:
+                if event is None:
+                    if self.close is not None:
+                        self.close(outbox.room)
+                elif to is not None:
+                    self.send(event, payload, to=to)
+                else:
+                    self.send(event, payload, room=outbox.room)
+            except Exception:
+                logger.exception("訊息送出失敗: %s", event, extra={'game_id': outbox.room})
+
+        # 佇列還有訊息：重新排隊，避免單一房間佔住送出執行緒
+        self.executor.submit(self._drain, outbox)
@@ -0,0 +1,275 @@
+# persistence.py - 遊戲狀態快照與行動日誌（伺服器重啟後可還原）
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('game.persistence')
+
+
+class GamePersistence:
+    """每場遊戲一份定期快照加上一份只增不改的日誌
+
+    快照只包含目前狀態，在開始、季度推進等時間點寫入（寫入暫存檔後原子性改名）；
+    政策行動、季度推進與事件依序編號附加到日誌，完整的行動歷史只保存在日誌中
+    （可交給 simulation.replay_game 重播）。還原時只重播序號大於快照 journal_seq 的紀錄。
+    所有寫入都由背景執行緒批次處理並 fsync，不佔用計時器執行緒。
+    """
+
+    def __init__(self, directory, flush_interval=0.2):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        os.makedirs(directory, exist_ok=True)
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer_thread.start()
+
+    def snapshot_path(self, game_id):
+        return os.path.join(self.directory, f'game_{game_id}.snapshot.json')
+
+    def journal_path(self, game_id):
+        return os.path.join(self.directory, f'game_{game_id}.journal.jsonl')
+
+    # ===== 寫入（由遊戲執行緒呼叫，只放入佇列） =====
+
+    def save_snapshot(self, game_id, snapshot):
+        """排入快照寫入（取代上一份快照，日誌不變）"""
+        data = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':'))
+        self.queue.put(('snapshot', game_id, data))
+
+    def append(self, game_id, record):
+        """排入一筆日誌"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        self.queue.put(('journal', game_id, line))
+
+    def delete(self, game_id):
+        """排入刪除遊戲的快照與日誌"""
+        self.queue.put(('delete', game_id, None))
+
+    def flush(self, timeout=None):
+        """等待佇列中的寫入全部完成"""
+        done = threading.Event()
+        self.queue.put(('barrier', None, done))
+        return done.wait(timeout)
+
+    # ===== 背景寫入執行緒 =====
+
+    def _writer_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            # 累積一小段時間內的寫入，一起 fsync
+            deadline = time.monotonic() + self.flush_interval
+            try:
+                while True:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+
+            try:
+                self._write_batch(batch)
+            except OSError as e:
+                logger.error("⚠️ 遊戲狀態寫入失敗: %s", e)
+
+    def _write_batch(self, batch):
+        journal_files = {}
+        barriers = []
+
+        def close_journal(game_id):
+            f = journal_files.pop(game_id, None)
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+
+        for kind, game_id, data in batch:
+            if kind == 'journal':
+                f = journal_files.get(game_id)
+                if f is None:
+                    f = journal_files[game_id] = open(self.journal_path(game_id), 'a', encoding='utf-8')
+                f.write(data + '\n')
+            elif kind == 'snapshot':
+                close_journal(game_id)
+                self._write_snapshot(game_id, data)
+            elif kind == 'delete':
+                close_journal(game_id)
+                for path in (self.snapshot_path(game_id), self.journal_path(game_id)):
+                    if os.path.exists(path):
+                        os.remove(path)
+            elif kind == 'barrier':
+                barriers.append(data)
+
+        for game_id in list(journal_files):
+            close_journal(game_id)
+        for done in barriers:
+            done.set()
+
+    def _write_snapshot(self, game_id, data):
+        path = self.snapshot_path(game_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    # ===== 讀取（伺服器啟動時） =====
+
+    def load_all(self):
+        """讀取所有遊戲的快照與日誌，回傳 [(snapshot, [record...]), ...]"""
+        games = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.snapshot.json'):
+                continue
+            game_id = name[len('game_'):-len('.snapshot.json')]
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning("⚠️ 無法讀取遊戲 %s 的快照: %s", game_id, e)
+                continue
+
+            games.append((snapshot, self.load_journal(game_id)))
+        return games
+
+    def load_journal(self, game_id):
+        """讀取遊戲的完整日誌（依寫入順序）"""
+        records = []
+        journal_path = self.journal_path(game_id)
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # 最後一行可能寫到一半
+        return records
+
+
+class LogArchive:
+    """超出記憶體緩衝區的遊戲日誌封存檔（每場遊戲一個 jsonl）
+
+    遊戲執行緒只排入佇列，由背景執行緒批次附加寫入，實時更新不必等待磁碟。
+    尚未寫入的日誌保留在記憶體中，讀取時與檔案內容合併。
+    """
+
+    def __init__(self, directory, flush_interval=0.2):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.pending = {}  # game_id: deque(尚未寫入的日誌)
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer_thread.start()
+
+    def path(self, game_id):
+        return os.path.join(self.directory, f'game_{game_id}_log.jsonl')
+
+    def append(self, game_id, entry):
+        """排入一筆封存日誌"""
+        with self.lock:
+            self.pending.setdefault(game_id, deque()).append(entry)
+        self.queue.put(('append', game_id, entry))
+
+    def delete(self, game_id):
+        """排入刪除封存檔（排在先前的寫入之後，尚未寫入的日誌直接捨棄）"""
+        with self.lock:
+            self.pending.pop(game_id, None)
+        self.queue.put(('delete', game_id, None))
+
+    def read(self, game_id, after_seq, limit):
+        """讀取序號大於 after_seq 的封存日誌（依序號，最多 limit 筆）"""
+        # 先取記憶體中尚未寫入的日誌，再讀檔案，避免漏掉讀取期間剛寫入的日誌
+        with self.lock:
+            pending = list(self.pending.get(game_id, ()))
+        entries = []
+        try:
+            with open(self.path(game_id), 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry['seq'] > after_seq:
+                        entries.append(entry)
+                        if len(entries) >= limit:
+                            return entries
+        except (OSError, json.JSONDecodeError):
+            pass
+        last_seq = entries[-1]['seq'] if entries else after_seq
+        for entry in pending:
+            if entry['seq'] > last_seq:
+                entries.append(entry)
+                if len(entries) >= limit:
+                    break
+        return entries
+
+    def flush(self, timeout=None):
+        """等待佇列中的寫入全部完成"""
+        done = threading.Event()
+        self.queue.put(('barrier', None, done))
+        return done.wait(timeout)
+
+    def _writer_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            try:
+                while True:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+
+            try:
+                self._write_batch(batch)
+            except OSError as e:
+                logger.error("⚠️ 日誌封存寫入失敗: %s", e)
+
+    def _write_batch(self, batch):
+        files = {}
+        written = []
+        barriers = []
+
+        def close_file(game_id):
+            f = files.pop(game_id, None)
+            if f is not None:
+                f.close()
+
+        for kind, game_id, data in batch:
+            if kind == 'append':
+                f = files.get(game_id)
+                if f is None:
+                    f = files[game_id] = open(self.path(game_id), 'a', encoding='utf-8')
+                f.write(json.dumps(data, ensure_ascii=False) + '\n')
+                written.append((game_id, data))
+            elif kind == 'delete':
+                close_file(game_id)
+                if os.path.exists(self.path(game_id)):
+                    os.remove(self.path(game_id))
+            elif kind == 'barrier':
+                barriers.append(data)
+
+        for game_id in list(files):
+            close_file(game_id)
+        # 已寫入檔案的日誌移出記憶體（delete 之後同代碼的新遊戲日誌不受影響）
+        with self.lock:
+            for game_id, entry in written:
+                pending = self.pending.get(game_id)
+                if pending and pending[0] is entry:
+                    pending.popleft()
+                    if not pending:
+                        del self.pending[game_id]
+        for done in barriers:
+            done.set()
+
+
+def create_persistence():
+    """依環境變數 GAME_DATA_DIR 建立持久化（未設定時停用）"""
+    directory = os.environ.get('GAME_DATA_DIR')
+    if not directory:
+        return None
+    return GamePersistence(directory)
+
+
+# 全域持久化實例（未啟用時為 None）
+game_persistence = create_persistence()
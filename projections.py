@@ -0,0 +1,39 @@
+# projections.py - 送往客戶端的玩家資料投影：靜態資料每個連線只送一次，其餘事件只帶畫面用到的欄位
+
+# 玩家靜態資料（加入或重新連線時送出，客戶端快取為名冊；slot 為二進位格式中代表玩家的編號）
+PLAYER_STATIC_FIELDS = ('id', 'name', 'country_code', 'country_name', 'country_flag', 'slot')
+
+# 畫面上顯示的經濟指標（自己國家面板、其他玩家列表與政策滑桿）
+INDICATOR_FIELDS = (
+    'gdp_growth', 'inflation', 'unemployment', 'confidence', 'stock_index',
+    'interest_rate', 'reserve_ratio', 'fiscal_deficit'
+)
+
+ROSTER_VIEW = (PLAYER_STATIC_FIELDS, ())
+INDICATOR_VIEW = (('id',), INDICATOR_FIELDS)
+
+# 各事件的玩家欄位：(玩家欄位, country_data 欄位)
+# 冷卻時間另由 realtime_update 的 players_cooldowns 送出，內部旗標（*_used 等）不送給客戶端
+VIEW_SCHEMAS = {
+    'game_created': ROSTER_VIEW,
+    'player_joined': ROSTER_VIEW,
+    'game_rejoined': ROSTER_VIEW,
+    'realtime_update': INDICATOR_VIEW,
+    'game_update': INDICATOR_VIEW,
+    'quarter_advanced': INDICATOR_VIEW
+}
+
+
+def project_player(player, event):
+    """依事件的欄位定義取出玩家資料（回傳新的字典）"""
+    player_fields, country_fields = VIEW_SCHEMAS[event]
+    view = {key: player[key] for key in player_fields}
+    if country_fields:
+        data = player['country_data']
+        view['country_data'] = {key: data[key] for key in country_fields}
+    return view
+
+
+def project_players(players, event):
+    """投影多位玩家（players 為 dict 的 values 或列表）"""
+    return [project_player(player, event) for player in players]
@@ -0,0 +1,92 @@
+# scheduler.py - 遊戲截止時間排程器（最小堆積）
+import heapq
+import itertools
+import math
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """以最小堆積保存每場遊戲的下一個截止時間
+
+    每場進行中的遊戲各有兩種截止時間：下一個實時更新幀（'frame'）
+    與下一個季度邊界（'quarter'）。計時器執行緒只睡到最早的截止時間，
+    未開始、暫停或已結束的遊戲不在堆積中，不佔任何成本。
+    """
+
+    def __init__(self, frame_interval=0.5, clock=time.time):
+        self.frame_interval = frame_interval
+        self.clock = clock
+        self.heap = []  # (deadline, 序號, game_id, kind)
+        self.generations = {}  # (game_id, kind): 目前有效項目的序號
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+
+    def next_frame_time(self, now=None):
+        """對齊全域網格的下一個幀時間（讓所有遊戲在同一輪批次更新）"""
+        if now is None:
+            now = self.clock()
+        return (math.floor(now / self.frame_interval) + 1) * self.frame_interval
+
+    def _push(self, game_id, kind, deadline):
+        # 序號全域遞增，取消後重新排入的項目不會與舊項目混淆
+        seq = next(self.counter)
+        self.generations[(game_id, kind)] = seq
+        heapq.heappush(self.heap, (deadline, seq, game_id, kind))
+        # 喚醒計時器重新計算睡眠時間
+        self.condition.notify()
+
+    def _is_current(self, entry):
+        _, seq, game_id, kind = entry
+        return self.generations.get((game_id, kind)) == seq
+
+    def add_game(self, game_id, quarter_deadline):
+        """開始或恢復遊戲時排入幀與季度截止時間"""
+        with self.condition:
+            self._push(game_id, 'frame', self.next_frame_time())
+            self._push(game_id, 'quarter', quarter_deadline)
+
+    def remove_game(self, game_id):
+        """暫停或結束遊戲時移出排程（堆積中的舊項目會被略過）"""
+        with self.condition:
+            self.generations.pop((game_id, 'frame'), None)
+            self.generations.pop((game_id, 'quarter'), None)
+
+    def schedule_frame(self, game_id):
+        """排入下一個實時更新幀"""
+        with self.condition:
+            self._push(game_id, 'frame', self.next_frame_time())
+
+    def schedule_quarter(self, game_id, quarter_deadline):
+        """排入（或更新）下一個季度邊界"""
+        with self.condition:
+            self._push(game_id, 'quarter', quarter_deadline)
+
+    def is_scheduled(self, game_id):
+        """遊戲是否仍在排程中"""
+        with self.condition:
+            return (game_id, 'quarter') in self.generations
+
+    def wait_due(self):
+        """阻塞直到最早的截止時間，回傳所有到期的 (game_id, kind)"""
+        with self.condition:
+            while True:
+                # 丟棄已被取代或取消的項目
+                while self.heap and not self._is_current(self.heap[0]):
+                    heapq.heappop(self.heap)
+
+                now = self.clock()
+                if self.heap and self.heap[0][0] <= now:
+                    due = []
+                    while self.heap and self.heap[0][0] <= now:
+                        entry = heapq.heappop(self.heap)
+                        if self._is_current(entry):
+                            _, _, game_id, kind = entry
+                            del self.generations[(game_id, kind)]
+                            due.append((game_id, kind))
+                    if due:
+                        return due
+                    continue
+
+                timeout = self.heap[0][0] - now if self.heap else None
+                self.condition.wait(timeout)
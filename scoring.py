@@ -1,5 +1,58 @@
 # scoring.py - 評分計算模組
 import math
+from collections import deque
+
+# 評分使用的歷史序列與保留季數
+HISTORY_SERIES = ('gdp_growth_history', 'inflation_history', 'unemployment_history',
+                  'confidence_history', 'stock_history', 'fiscal_deficit_history')
+HISTORY_WINDOW = 17  # 保留17季歷史
+RELATIVE_INDICATORS = ('gdp_growth', 'confidence', 'unemployment')  # 相對表現排名指標
+
+
+class RollingStats:
+    """固定視窗的滑動平均與變異數
+
+    每季新增一筆時以 Welford 公式增量更新，視窗滿時同時移除最舊的一筆，
+    取得波動度不需重新走訪整段歷史。
+    """
+
+    __slots__ = ('values', 'mean', 'm2')
+
+    def __init__(self, window=HISTORY_WINDOW, values=()):
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0  # 與平均差的平方和
+        for value in values:
+            self.push(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def push(self, value):
+        """加入新的一季數值"""
+        if len(self.values) == self.values.maxlen:
+            self._remove(self.values[0])
+        self.values.append(value)
+        delta = value - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, value):
+        count = len(self.values) - 1
+        if count == 0:
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / count
+        self.m2 = max(0.0, self.m2 - delta * (value - self.mean))
+
+    def volatility(self):
+        """母體標準差"""
+        if len(self.values) < 2:
+            return 0
+        return math.sqrt(self.m2 / len(self.values))
+
 
 class ScoringSystem:
     def __init__(self):
@@ -65,6 +118,8 @@ class ScoringSystem:
     
     def calculate_volatility(self, history):
         """計算指標波動度（標準差）"""
+        if isinstance(history, RollingStats):
+            return history.volatility()
         if len(history) < 2:
             return 0
         
@@ -72,13 +127,18 @@ class ScoringSystem:
         variance = sum((x - mean) ** 2 for x in history) / len(history)
         return math.sqrt(variance)
     
-    def calculate_financial_stability(self, country_data):
+    def create_history_stats(self, country_data):
+        """由國家數據的歷史序列建立滑動統計（每季以 push 更新）"""
+        return {key: RollingStats(HISTORY_WINDOW, country_data.get(key, [])[-HISTORY_WINDOW:])
+                for key in HISTORY_SERIES}
+    
+    def calculate_financial_stability(self, country_data, stats=None):
         """計算金融穩定性得分"""
         score = 0
         max_score = self.common_weights['financial_stability']
         
         # 股市波動度 (50%)
-        stock_history = country_data.get('stock_history', [])
+        stock_history = stats['stock_history'] if stats else country_data.get('stock_history', [])
         if len(stock_history) >= 4:
             volatility = self.calculate_volatility(stock_history)
             if volatility < 15:
@@ -106,29 +166,46 @@ class ScoringSystem:
         
         return score
     
-    def calculate_country_bonus(self, player, all_players):
+    def build_score_context(self, all_players):
+        """一次計算所有玩家共用的比較基準：各指標排名、他國平均與最大值"""
+        players = list(all_players.values())
+        
+        # 各指標排名（排序穩定，同分時依玩家順序，與逐一查找的結果相同）
+        ranks = {}
+        for indicator in RELATIVE_INDICATORS:
+            # 失業率是越低越好，其他指標是越高越好
+            reverse = (indicator == 'unemployment')
+            ordered = sorted(players, key=lambda p: p['country_data'][indicator], reverse=not reverse)
+            ranks[indicator] = {p['id']: rank for rank, p in enumerate(ordered)}
+        
+        other_inflation = [p['country_data']['inflation'] for p in players if p['country_code'] != 'USA']
+        other_gdp = [p['country_data']['gdp_growth'] for p in players if p['country_code'] != 'CHN']
+        return {
+            'player_count': len(players),
+            'ranks': ranks,
+            'avg_inflation_excluding_usa': sum(other_inflation) / len(other_inflation) if other_inflation else None,
+            'max_gdp_excluding_chn': max(other_gdp) if other_gdp else None
+        }
+    
+    def calculate_country_bonus(self, player, all_players, context=None):
         """計算國家特色加分項"""
+        if context is None:
+            context = self.build_score_context(all_players)
         country_code = player['country_code']
         data = player['country_data']
         bonus_score = 0
         
         if country_code == 'USA':
             # 通膨控制領先地位
-            other_inflation = [p['country_data']['inflation'] 
-                             for p in all_players.values() 
-                             if p['country_code'] != 'USA']
-            if other_inflation:
-                avg_inflation = sum(other_inflation) / len(other_inflation)
+            avg_inflation = context['avg_inflation_excluding_usa']
+            if avg_inflation is not None:
                 diff = avg_inflation - data['inflation']
                 bonus_score = min(self.country_bonus, max(0, diff * 40))
         
         elif country_code == 'CHN':
             # GDP成長率領先
-            other_gdp = [p['country_data']['gdp_growth'] 
-                        for p in all_players.values() 
-                        if p['country_code'] != 'CHN']
-            if other_gdp:
-                max_other_gdp = max(other_gdp)
+            max_other_gdp = context['max_gdp_excluding_chn']
+            if max_other_gdp is not None:
                 diff = data['gdp_growth'] - max_other_gdp
                 bonus_score = min(self.country_bonus, max(0, diff * 60))
         
@@ -183,8 +260,24 @@ class ScoringSystem:
         
         return bonus_score
     
-    def calculate_final_score(self, player, all_players, game_quarter):
-        """計算最終得分"""
+    def score_all(self, all_players, game_quarter, stats_by_player=None):
+        """一次計算所有玩家的得分，回傳 {player_id: 得分結果}
+
+        排名、他國平均與最大值只計算一次，供每位玩家共用。
+        """
+        context = self.build_score_context(all_players)
+        stats_by_player = stats_by_player or {}
+        return {
+            player_id: self.calculate_final_score(
+                player, all_players, game_quarter, stats_by_player.get(player_id), context
+            )
+            for player_id, player in all_players.items()
+        }
+    
+    def calculate_final_score(self, player, all_players, game_quarter, stats=None, context=None):
+        """計算最終得分（stats 為 create_history_stats 的滑動統計，未提供時由歷史重新計算）"""
+        if context is None:
+            context = self.build_score_context(all_players)
         data = player['country_data']
         total_score = 0
         score_details = {}
@@ -200,7 +293,8 @@ class ScoringSystem:
         
         for indicator, value in indicators.items():
             if indicator in self.common_weights:
-                history = data.get(f'{indicator}_history', [])
+                key = f'{indicator}_history'
+                history = stats[key] if stats else data.get(key, [])
                 score = self.calculate_indicator_score(
                     value, indicator, self.common_weights[indicator], history
                 )
@@ -208,7 +302,7 @@ class ScoringSystem:
                 score_details[indicator] = score
         
         # 金融穩定性
-        financial_score = self.calculate_financial_stability(data)
+        financial_score = self.calculate_financial_stability(data, stats)
         total_score += financial_score
         score_details['financial_stability'] = financial_score
         
@@ -218,12 +312,12 @@ class ScoringSystem:
         score_details['cpi_stability'] = cpi_score
         
         # 國家特色加分項
-        country_bonus = self.calculate_country_bonus(player, all_players)
+        country_bonus = self.calculate_country_bonus(player, all_players, context)
         total_score += country_bonus
         score_details['country_bonus'] = country_bonus
         
         # 相對表現獎勵
-        relative_bonus = self.calculate_relative_bonus(player, all_players)
+        relative_bonus = self.calculate_relative_bonus(player, all_players, context)
         total_score += relative_bonus
         score_details['relative_bonus'] = relative_bonus
         
@@ -233,27 +327,21 @@ class ScoringSystem:
             'grade': self.get_grade(total_score)
         }
     
-    def calculate_relative_bonus(self, player, all_players):
+    def calculate_relative_bonus(self, player, all_players, context=None):
         """計算相對表現獎勵"""
+        if context is None:
+            context = self.build_score_context(all_players)
         bonus = 0
-        data = player['country_data']
         
         # 統計各指標排名
-        indicators = ['gdp_growth', 'confidence', 'unemployment']
         top_half_count = 0
         first_place_count = 0
         
-        for indicator in indicators:
-            values = [(p['id'], p['country_data'][indicator]) for p in all_players.values()]
-            
-            # 失業率是越低越好，其他指標是越高越好
-            reverse = (indicator == 'unemployment')
-            values.sort(key=lambda x: x[1], reverse=not reverse)
-            
-            player_rank = next(i for i, (pid, _) in enumerate(values) if pid == player['id'])
+        for indicator in RELATIVE_INDICATORS:
+            player_rank = context['ranks'][indicator][player['id']]
             
             # 前50%加分
-            if player_rank < len(values) / 2:
+            if player_rank < context['player_count'] / 2:
                 top_half_count += 1
             
             # 第一名加分
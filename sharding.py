@@ -0,0 +1,135 @@
+# sharding.py - 多行程遊戲分片與啟動器
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import zlib
+
+
+def shard_for_game(game_id, shard_count):
+    """依 game_id 計算所屬分片（各行程結果一致）"""
+    if shard_count <= 1:
+        return 0
+    return zlib.crc32(str(game_id).encode('utf-8')) % shard_count
+
+
+class ShardConfig:
+    """目前行程的分片設定（由啟動器透過環境變數傳入）"""
+
+    def __init__(self, shard_index=0, shard_count=1, shard_urls=None, message_queue=None):
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.shard_urls = shard_urls or []
+        self.message_queue = message_queue
+
+    @classmethod
+    def from_env(cls):
+        urls = os.environ.get('SHARD_URLS', '')
+        return cls(
+            shard_index=int(os.environ.get('SHARD_INDEX', 0)),
+            shard_count=int(os.environ.get('SHARD_COUNT', 1)),
+            shard_urls=[url for url in urls.split(',') if url],
+            message_queue=os.environ.get('MESSAGE_QUEUE') or None
+        )
+
+    @property
+    def enabled(self):
+        return self.shard_count > 1
+
+    def owns(self, game_id):
+        """此行程是否負責該遊戲"""
+        return shard_for_game(game_id, self.shard_count) == self.shard_index
+
+    def owner_url(self, game_id):
+        """負責該遊戲的分片網址"""
+        index = shard_for_game(game_id, self.shard_count)
+        if index < len(self.shard_urls):
+            return self.shard_urls[index]
+        return None
+
+    def to_dict(self):
+        return {
+            'shard_index': self.shard_index,
+            'shard_count': self.shard_count,
+            'shard_urls': self.shard_urls
+        }
+
+
+# 全域分片設定
+shard_config = ShardConfig.from_env()
+
+
+def build_shard_map(workers, host, base_port, public_host):
+    """建立分片對照表"""
+    return [
+        {
+            'shard_index': index,
+            'port': base_port + index,
+            'url': f'http://{public_host}:{base_port + index}',
+            'bind': f'{host}:{base_port + index}'
+        }
+        for index in range(workers)
+    ]
+
+
+def launch_workers(workers, host='0.0.0.0', base_port=5000, public_host='localhost', message_queue=None):
+    """啟動 N 個遊戲伺服器行程，回傳 (分片對照表, 行程列表)"""
+    shard_map = build_shard_map(workers, host, base_port, public_host)
+    urls = ','.join(shard['url'] for shard in shard_map)
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+    processes = []
+    for shard in shard_map:
+        env = dict(os.environ)
+        env.update({
+            'PORT': str(shard['port']),
+            'SHARD_INDEX': str(shard['shard_index']),
+            'SHARD_COUNT': str(workers),
+            'SHARD_URLS': urls
+        })
+        if message_queue:
+            env['MESSAGE_QUEUE'] = message_queue
+        process = subprocess.Popen([sys.executable, app_path], env=env)
+        shard['pid'] = process.pid
+        processes.append(process)
+
+    return shard_map, processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='啟動多個遊戲伺服器分片')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='分片（行程）數量')
+    parser.add_argument('--host', default='0.0.0.0', help='綁定位址')
+    parser.add_argument('--base-port', type=int, default=int(os.environ.get('PORT', 5000)), help='第一個分片的埠號')
+    parser.add_argument('--public-host', default='localhost', help='客戶端連線用的主機名稱')
+    parser.add_argument('--message-queue', default=os.environ.get('MESSAGE_QUEUE'),
+                        help='跨行程廣播用的訊息佇列（例如 redis://localhost:6379/0）')
+    args = parser.parse_args()
+
+    shard_map, processes = launch_workers(
+        args.workers, args.host, args.base_port, args.public_host, args.message_queue
+    )
+    print(json.dumps({'message_queue': args.message_queue, 'shards': shard_map}, indent=2))
+
+    def shutdown(signum, frame):
+        for process in processes:
+            process.terminate()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    # 任一分片結束時回報
+    while True:
+        for shard, process in zip(shard_map, processes):
+            if process.poll() is not None:
+                print(f"⚠️ 分片 {shard['shard_index']} (pid {process.pid}) 已結束，代碼 {process.returncode}")
+                shutdown(None, None)
+        time.sleep(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+# simulation.py - 無伺服器批次模擬（不需 Socket.IO、不需等待實際時間）
+import argparse
+import contextlib
+import io
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from app import GameState, COUNTRY_CONFIGS, apply_policy_action
+
+DEFAULT_COUNTRIES = ['USA', 'CHN', 'JPN', 'TWN', 'BRA', 'SAU']
+TICK_SECONDS = 0.5  # 與伺服器實時更新間隔相同
+RECORDED_INDICATORS = ['gdp_growth', 'inflation', 'unemployment', 'confidence', 'stock_index', 'fiscal_deficit']
+
+# 各國主動技能
+ACTIVE_SKILLS = {
+    'USA': 'usa_trade_war',
+    'CHN': 'china_mass_mobilization',
+    'JPN': 'japan_aging_solution',
+    'TWN': 'taiwan_bet',
+    'BRA': 'brazil_anticorruption',
+    'SAU': 'saudi_transformation'
+}
+
+
+def random_policy_action(country_code, country_data, other_countries, rng):
+    """隨機產生一個合法格式的政策行動"""
+    choices = ['interest_rate', 'reserve_ratio', 'fiscal_policy', 'quantitative_easing', 'cash_distribution']
+    if country_code in ACTIVE_SKILLS:
+        choices.append(ACTIVE_SKILLS[country_code])
+    if country_code == 'SAU':
+        choices.append('oil_control')
+
+    action_type = rng.choice(choices)
+    action = {'action_type': action_type}
+
+    if action_type == 'interest_rate':
+        action['value'] = round(max(-2, min(20, country_data['interest_rate'] + rng.choice([-0.5, -0.25, 0.25, 0.5]))), 2)
+    elif action_type == 'reserve_ratio':
+        action['value'] = round(max(0, min(30, country_data['reserve_ratio'] + rng.choice([-1.0, -0.5, 0.5, 1.0]))), 1)
+    elif action_type == 'fiscal_policy':
+        action['policy_type'] = rng.choice(['increase_spending', 'decrease_spending'])
+    elif action_type == 'quantitative_easing':
+        action['direction'] = rng.choice(['easing', 'tightening'])
+    elif action_type == 'oil_control':
+        action['direction'] = rng.choice(['increase', 'decrease'])
+    elif action_type in ('usa_trade_war', 'taiwan_bet'):
+        if not other_countries:
+            return None
+        action['target_country'] = rng.choice(other_countries)
+
+    return action
+
+
+def snapshot_indicators(game):
+    """記錄每位玩家當季的經濟指標"""
+    return {
+        'quarter': game.current_quarter,
+        'global_oil_price': game.global_oil_price,
+        'players': {
+            player['country_code']: {key: player['country_data'][key] for key in RECORDED_INDICATORS}
+            for player in game.players.values()
+        }
+    }
+
+
+def run_game(seed=None, countries=None, quarters=17, schedules=None, policy='random',
+             actions_per_quarter=2, quarter_duration=30.0):
+    """完整模擬一場遊戲
+
+    schedules: {country_code: {quarter: [action, ...]}} 指定的政策排程，
+    未指定排程的國家依 policy（'random' 或 'none'）決定行動。
+    回傳最終評分與每季歷史。
+    """
+    countries = countries or DEFAULT_COUNTRIES
+    schedules = schedules or {}
+    game = GameState(f'sim-{seed}', 'p0', headless=True, seed=seed)
+    policy_rng = random.Random(f'{game.seed}:schedule')
+
+    for index, country_code in enumerate(countries):
+        game.add_player(f'p{index}', COUNTRY_CONFIGS[country_code]['name'], country_code)
+    game.game_duration_quarters = quarters
+    game.quarter_duration = quarter_duration
+    game.start_game()
+
+    ticks_per_quarter = int(quarter_duration / TICK_SECONDS)
+    clock = 0.0
+    history = [snapshot_indicators(game)]
+    action_log = []
+
+    while game.game_started:
+        # 安排本季行動的發生時間（以 tick 為單位）
+        planned = []
+        for player in game.players.values():
+            country_code = player['country_code']
+            if country_code in schedules:
+                actions = schedules[country_code].get(game.current_quarter, [])
+            elif policy == 'random':
+                others = [p['country_code'] for p in game.players.values() if p['country_code'] != country_code]
+                actions = [random_policy_action(country_code, player['country_data'], others, policy_rng)
+                           for _ in range(actions_per_quarter)]
+            else:
+                actions = []
+            for action in actions:
+                if action:
+                    planned.append((policy_rng.randrange(ticks_per_quarter), player['id'], action))
+        planned.sort(key=lambda item: item[0])
+
+        for tick in range(ticks_per_quarter):
+            clock += TICK_SECONDS
+            while planned and planned[0][0] == tick:
+                _, player_id, action = planned.pop(0)
+                success, message = apply_policy_action(game, game.players[player_id], action, current_time=clock)
+                action_log.append({
+                    'quarter': game.current_quarter,
+                    'tick': tick,
+                    'country_code': game.players[player_id]['country_code'],
+                    'action': action,
+                    'success': success
+                })
+            game.tick_realtime()
+
+        game.advance_quarter()
+        history.append(snapshot_indicators(game))
+
+    final_scores = game.final_scores or game.calculate_final_scores()
+    return {
+        'seed': game.seed,
+        'countries': countries,
+        'quarters': quarters,
+        'final_scores': final_scores,
+        'history': history,
+        'actions': action_log,
+        'metadata': game.get_metadata(),
+        'replay_log': game.action_log
+    }
+
+
+def replay_game(metadata, action_log):
+    """以遊戲資訊（含 seed）與行動紀錄重播一場遊戲，回傳重建的 GameState
+
+    action_log 可為 run_game 的 replay_log 或伺服器的持久化日誌（事件紀錄會略過）。
+    """
+    game = GameState(metadata['game_id'], metadata['host_player_id'], headless=True, seed=metadata['seed'])
+    for player in metadata['players']:
+        game.add_player(player['id'], player['name'], player['country_code'])
+    game.quarter_duration = metadata['quarter_duration']
+    game.game_duration_quarters = metadata['game_duration_quarters']
+    game.start_game()
+
+    for entry in action_log:
+        if entry['type'] not in ('quarter', 'policy_action'):
+            continue  # 事件由季度推進重新產生
+        # 補足紀錄發生前的實時更新
+        while game.tick_count < entry['tick']:
+            game.tick_realtime()
+        if entry['type'] == 'quarter':
+            game.advance_quarter()
+        elif entry['type'] == 'policy_action':
+            apply_policy_action(game, game.players[entry['player_id']], entry['data'], current_time=entry['time'])
+
+    return game
+
+
+def _run_game_quiet(kwargs):
+    """在工作行程中執行模擬並隱藏遊戲輸出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_game(**kwargs)
+
+
+def run_batch(games, base_seed=0, max_workers=None, **kwargs):
+    """以行程池平行模擬多場遊戲，回傳每場結果"""
+    jobs = [dict(kwargs, seed=base_seed + index) for index in range(games)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_run_game_quiet, jobs, chunksize=max(1, games // 64)))
+
+
+def summarize(results):
+    """統計各國平均分數與勝率"""
+    summary = {}
+    for result in results:
+        winner = result['final_scores'][0]['country_name'] if result['final_scores'] else None
+        for score in result['final_scores']:
+            entry = summary.setdefault(score['country_name'], {'games': 0, 'total_score': 0.0, 'wins': 0})
+            entry['games'] += 1
+            entry['total_score'] += score['total_score']
+            if score['country_name'] == winner:
+                entry['wins'] += 1
+    for entry in summary.values():
+        entry['average_score'] = round(entry['total_score'] / entry['games'], 1)
+        entry['win_rate'] = round(entry['wins'] / entry['games'], 3)
+        del entry['total_score']
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='無伺服器批次模擬')
+    parser.add_argument('--games', type=int, default=100, help='模擬場數')
+    parser.add_argument('--workers', type=int, default=None, help='工作行程數（預設為 CPU 數）')
+    parser.add_argument('--quarters', type=int, default=17, help='每場季數')
+    parser.add_argument('--seed', type=int, default=0, help='起始種子')
+    parser.add_argument('--countries', default=','.join(DEFAULT_COUNTRIES), help='參與國家（逗號分隔）')
+    parser.add_argument('--policy', choices=['random', 'none'], default='random', help='未排程國家的行動方式')
+    parser.add_argument('--output', help='將完整結果寫入 JSON 檔')
+    args = parser.parse_args()
+
+    results = run_batch(
+        args.games, base_seed=args.seed, max_workers=args.workers,
+        countries=args.countries.split(','), quarters=args.quarters, policy=args.policy
+    )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False)
+
+    print(json.dumps(summarize(results), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
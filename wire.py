@@ -0,0 +1,125 @@
+# wire.py - Socket.IO 訊息編碼：JSON 預先編碼片段（Fragment），以及選用的 MessagePack 二進位格式
+import json
+import struct
+
+from country_state import to_wire
+from projections import INDICATOR_FIELDS
+
+try:
+    import msgpack
+except ImportError:  # 未安裝 msgpack 時只提供 JSON
+    msgpack = None
+
+# 片段在外層 JSON 中的佔位字串（編碼後再替換為片段內容）
+PLACEHOLDER = '\x00fragment:{}\x00'
+
+
+class Fragment:
+    """預先編碼的 JSON 片段
+
+    第一次編碼時快取結果，之後嵌入任何訊息（不同事件、不同接收者）都直接
+    使用快取的文字，不再重新序列化。
+    """
+
+    __slots__ = ('value', 'encoded_cache')
+
+    def __init__(self, value):
+        self.value = value
+        self.encoded_cache = None
+
+    @property
+    def encoded(self):
+        if self.encoded_cache is None:
+            self.encoded_cache = dumps(self.value)
+        return self.encoded_cache
+
+    def __getstate__(self):
+        return (self.value, self.encoded_cache)
+
+    def __setstate__(self, state):
+        self.value, self.encoded_cache = state
+
+
+def dumps(obj, **kwargs):
+    """與 json.dumps 相同（預設為 Socket.IO 的緊湊格式），並嵌入 Fragment 與 CountryState"""
+    fragments = []
+    fallback = kwargs.pop('default', to_wire)
+
+    def default(value):
+        if isinstance(value, Fragment):
+            fragments.append(value)
+            return PLACEHOLDER.format(len(fragments) - 1)
+        return fallback(value)
+
+    if isinstance(obj, Fragment):
+        return obj.encoded
+    kwargs.setdefault('separators', (',', ':'))
+    encoded = json.dumps(obj, default=default, **kwargs)
+    for index, fragment in enumerate(fragments):
+        encoded = encoded.replace(json.dumps(PLACEHOLDER.format(index)), fragment.encoded, 1)
+    return encoded
+
+
+# ===== 二進位格式（MessagePack，連線時協商） =====
+
+BINARY_WIRE = 'msgpack'
+BINARY_EVENTS = ('realtime_update', 'quarter_advanced', 'game_update')  # 高頻事件才使用二進位格式
+
+# 玩家指標列：slot（uint8）、欄位遮罩（uint8，位元順序同 INDICATOR_FIELDS），之後為遮罩內各欄位的 float32
+ROW_HEADER = struct.Struct('<BB')
+# 冷卻列：slot（uint8）、全局政策剩餘秒數、主動技能剩餘季數（float32）
+COOLDOWN_ROW = struct.Struct('<Bff')
+
+
+def binary_available():
+    return msgpack is not None
+
+
+def pack_indicator_rows(players, slot_of):
+    """玩家投影（或差異）轉為固定寬度的指標列"""
+    rows = bytearray()
+    for player in players:
+        slot = slot_of(player['id'])
+        if slot is None:
+            continue
+        data = player.get('country_data', {})
+        mask = 0
+        values = []
+        for bit, field in enumerate(INDICATOR_FIELDS):
+            if field in data:
+                mask |= 1 << bit
+                values.append(data[field])
+        rows += ROW_HEADER.pack(slot, mask)
+        rows += struct.pack(f'<{len(values)}f', *values)
+    return bytes(rows)
+
+
+def pack_cooldown_rows(cooldowns, slot_of):
+    rows = bytearray()
+    for entry in cooldowns:
+        slot = slot_of(entry['player_id'])
+        if slot is None:
+            continue
+        status = entry['cooldown_status']
+        rows += COOLDOWN_ROW.pack(slot, status['global_policy_cooldown'], status['active_skill'])
+    return bytes(rows)
+
+
+def pack_binary(payload, slot_of):
+    """將事件資料編碼為 MessagePack
+
+    玩家列表（players / player_patches）與 players_cooldowns 改為依 slot 排列的
+    固定寬度數值列（bin），其餘欄位維持原本的結構。slot_of(player_id) 回傳玩家的 slot。
+    """
+    if isinstance(payload, Fragment):
+        payload = payload.value
+    body = dict(payload)
+    for key in ('players', 'player_patches'):
+        if key in body:
+            players = body[key]
+            if isinstance(players, Fragment):
+                players = players.value
+            body[key] = pack_indicator_rows(players, slot_of)
+    if 'players_cooldowns' in body:
+        body['players_cooldowns'] = pack_cooldown_rows(body['players_cooldowns'], slot_of)
+    return msgpack.packb(body, default=to_wire)